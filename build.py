@@ -7,9 +7,15 @@ PyInstaller打包脚本
 
 import os
 import sys
+import json
 import subprocess
 import shutil
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 默认使用onedir模式，避免onefile每次启动都要解压到临时目录；
+# 设置环境变量 PYINSTALLER_BUILD_ONEFILE=1 可恢复单文件打包
+ONEFILE = os.environ.get('PYINSTALLER_BUILD_ONEFILE', '').lower() in ('1', 'true', 'yes')
 
 def clean_build_dirs():
     """清理构建目录"""
@@ -26,6 +32,52 @@ def clean_build_dirs():
         spec_file.unlink()
         print(f"已删除文件: {spec_file}")
 
+def _llm_enabled():
+    """读取config.json，判断是否启用了LLM功能"""
+    try:
+        with open('config.json', 'r', encoding='utf-8') as f:
+            return json.load(f).get('llm', {}).get('enabled', False)
+    except (OSError, ValueError):
+        # 无法读取配置时按启用处理，保证打包结果可用
+        return True
+
+def _parallel_copytree(src, dst, workers=8):
+    """多线程复制目录树：目录按顺序创建，文件复制并行提交到线程池"""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        pending = [(str(src), str(dst))]
+        while pending:
+            src_dir, dst_dir = pending.pop()
+            os.makedirs(dst_dir, exist_ok=True)
+            with os.scandir(src_dir) as entries:
+                for entry in entries:
+                    target = os.path.join(dst_dir, entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append((entry.path, target))
+                    else:
+                        futures.append(executor.submit(shutil.copy2, entry.path, target))
+
+        for future in as_completed(futures):
+            future.result()
+
+def copy_tree(src, dst):
+    """复制目录树，Windows下优先使用robocopy多线程复制"""
+    if dst.exists():
+        shutil.rmtree(dst)
+
+    robocopy = shutil.which('robocopy') if os.name == 'nt' else None
+    if robocopy:
+        result = subprocess.run(
+            [robocopy, str(src), str(dst), '/S', '/MT:16', '/NFL', '/NDL', '/NJH', '/NJS'],
+            bufsize=-1, capture_output=True, text=True
+        )
+        # robocopy返回值小于8均表示成功
+        if result.returncode < 8:
+            return
+        print(f"robocopy复制失败（返回值 {result.returncode}），改用内置复制")
+
+    _parallel_copytree(src, dst)
+
 def build_exe():
     """构建exe文件"""
     print("开始构建exe文件...")
@@ -33,31 +85,37 @@ def build_exe():
     # PyInstaller命令参数
     cmd = [
         'pyinstaller',
-        '--onefile',                    # 打包成单个exe文件
+        '--onefile' if ONEFILE else '--onedir',  # 单文件或目录模式
         '--windowed',                   # 无控制台窗口（后台运行）
         '--name=ScreenCapture',         # exe文件名
         '--icon=icon.ico',              # 图标文件（如果存在）
         '--add-data=config.json;.',     # 包含配置文件
         '--add-data=templates;templates',  # 包含模板文件夹
         '--add-data=static;static',     # 包含静态文件夹
+        # 只声明运行时动态导入的模块，不再使用--collect-all整包收集
         '--hidden-import=pynput.keyboard._win32',
         '--hidden-import=pynput.mouse._win32',
-        '--hidden-import=PIL._tkinter_finder',
+        '--hidden-import=PIL.Image',
+        '--hidden-import=PIL.ImageGrab',
         '--hidden-import=fastapi',      # FastAPI Web框架
-        '--hidden-import=uvicorn',      # ASGI服务器
-        '--hidden-import=starlette',    # Starlette框架
         '--hidden-import=starlette.staticfiles',  # 静态文件支持
         '--hidden-import=starlette.templating',   # 模板支持
         '--hidden-import=jinja2',       # 模板引擎
-        '--collect-all=pynput',
-        '--collect-all=PIL',
-        '--collect-all=pyperclip',
-        '--collect-all=fastapi',        # 收集FastAPI所有模块
-        '--collect-all=uvicorn',        # 收集uvicorn所有模块
-        '--collect-all=starlette',      # 收集starlette所有模块
+        '--collect-submodules=uvicorn', # uvicorn按名称动态加载loop/protocol实现
+        '--exclude-module=tkinter',     # 未使用的标准库模块
+        '--exclude-module=test',
         'main.py'
     ]
     
+    # LLM功能未启用时不打包按需导入的LLM SDK，缩小体积并加快分析阶段
+    if not _llm_enabled():
+        cmd[-1:-1] = [
+            '--exclude-module=openai',
+            '--exclude-module=anthropic',
+            '--exclude-module=volcenginesdkarkruntime',
+        ]
+        print("LLM功能未启用，跳过打包openai/anthropic/volcenginesdkarkruntime")
+    
     # 如果没有图标文件，移除图标参数
     if not os.path.exists('icon.ico'):
         cmd = [arg for arg in cmd if not arg.startswith('--icon')]
@@ -65,12 +123,14 @@ def build_exe():
     
     try:
         # 执行PyInstaller命令
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        # 显式使用bufsize=-1（完全缓冲）读取管道输出；bufsize=0会逐字节读取，
+        # 大量输出时吞吐量急剧下降，后续重构时不要改成无缓冲
+        result = subprocess.run(cmd, bufsize=-1, check=True, capture_output=True, text=True)
         print("构建成功！")
         print(result.stdout)
         
-        # 复制配置文件和静态资源到dist目录
-        dist_dir = Path('dist')
+        # 复制配置文件和静态资源到exe所在目录（onedir模式下为 dist/ScreenCapture）
+        dist_dir = Path('dist') if ONEFILE else Path('dist') / 'ScreenCapture'
         if dist_dir.exists():
             # 复制配置文件
             config_src = Path('config.json')
@@ -85,9 +145,7 @@ def build_exe():
             static_dst = dist_dir / 'static'
             
             if static_src.exists():
-                if static_dst.exists():
-                    shutil.rmtree(static_dst)
-                shutil.copytree(static_src, static_dst)
+                copy_tree(static_src, static_dst)
                 print(f"已复制静态文件夹到: {static_dst}")
             
             # 复制templates文件夹
@@ -95,9 +153,7 @@ def build_exe():
             templates_dst = dist_dir / 'templates'
             
             if templates_src.exists():
-                if templates_dst.exists():
-                    shutil.rmtree(templates_dst)
-                shutil.copytree(templates_src, templates_dst)
+                copy_tree(templates_src, templates_dst)
                 print(f"已复制模板文件夹到: {templates_dst}")
         
         print(f"\n构建完成！exe文件位于: {dist_dir / 'ScreenCapture.exe'}")
@@ -132,7 +188,7 @@ def main():
     
     # 检查是否安装了PyInstaller
     try:
-        subprocess.run(['pyinstaller', '--version'], check=True, capture_output=True)
+        subprocess.run(['pyinstaller', '--version'], bufsize=-1, check=True, capture_output=True)
     except (subprocess.CalledProcessError, FileNotFoundError):
         print("错误: 未找到PyInstaller，请先安装：pip install pyinstaller")
         return False
@@ -151,7 +207,7 @@ def main():
         print("打包完成！")
         print("=" * 50)
         print("使用说明:")
-        print("1. exe文件位于 dist/ 目录下")
+        print(f"1. exe文件位于 {'dist/' if ONEFILE else 'dist/ScreenCapture/'} 目录下")
         print("2. config.json、static和templates文件夹已自动复制")
         print("3. 双击exe文件即可运行")
         print("4. 程序将在后台运行，按Ctrl+C退出")
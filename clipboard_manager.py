@@ -1,43 +1,69 @@
+import time
+import logging
 import pyperclip
 from typing import Optional
 
+logger = logging.getLogger('ClipboardManager')
+
 class ClipboardManager:
+    # 剪贴板读取结果的缓存有效期（秒），合并短时间内的重复系统调用
+    _CACHE_TTL = 0.05
+    
     def __init__(self):
         self.last_content = ""
+        self._cache_ts = 0.0
+        self._cache_val: Optional[str] = None
+    
+    def _read(self, force: bool = False) -> str:
+        """读取剪贴板，短时间内的重复读取直接返回缓存结果"""
+        now = time.monotonic()
+        if not force and self._cache_val is not None and now - self._cache_ts < self._CACHE_TTL:
+            return self._cache_val
+        
+        content = pyperclip.paste()
+        self._cache_val = content
+        self._cache_ts = now
+        return content
+    
+    def _invalidate_cache(self):
+        """使剪贴板缓存失效"""
+        self._cache_val = None
     
     def get_clipboard_content(self) -> Optional[str]:
         """获取剪贴板内容"""
         try:
-            content = pyperclip.paste()
+            content = self._read()
             if content:
                 self.last_content = content
-                print(f"获取剪贴板内容: {content[:100]}{'...' if len(content) > 100 else ''}")
+                logger.info("获取剪贴板内容: %s%s", content[:100], "..." if len(content) > 100 else "")
                 return content
             else:
-                print("剪贴板为空")
+                logger.info("剪贴板为空")
                 return None
         except Exception as e:
-            print(f"获取剪贴板内容失败: {str(e)}")
+            logger.error("获取剪贴板内容失败: %s", e)
             return None
     
     def set_clipboard_content(self, content: str) -> bool:
         """设置剪贴板内容"""
         try:
+            self._invalidate_cache()
             pyperclip.copy(content)
-            print(f"已设置剪贴板内容: {content[:100]}{'...' if len(content) > 100 else ''}")
+            logger.info("已设置剪贴板内容: %s%s", content[:100], "..." if len(content) > 100 else "")
             return True
         except Exception as e:
-            print(f"设置剪贴板内容失败: {str(e)}")
+            logger.error("设置剪贴板内容失败: %s", e)
             return False
     
     def clear_clipboard(self) -> bool:
         """清空剪贴板"""
         try:
+            self._invalidate_cache()
             pyperclip.copy("")
-            print("剪贴板已清空")
+            logger.info("剪贴板已清空")
             return True
         except Exception as e:
-            print(f"清空剪贴板失败: {str(e)}")
+            logger.error("清空剪贴板失败: %s", e)
             return False
     
     def get_last_content(self) -> str:
@@ -47,8 +73,8 @@ class ClipboardManager:
     def is_clipboard_empty(self) -> bool:
         """检查剪贴板是否为空"""
         try:
-            content = pyperclip.paste()
+            content = self._read()
             return not content or content.strip() == ""
         except Exception as e:
-            print(f"检查剪贴板状态失败: {str(e)}")
+            logger.error("检查剪贴板状态失败: %s", e)
             return True
\ No newline at end of file
@@ -1,24 +1,60 @@
 import smtplib
+import ssl
 import os
+import threading
+import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
+from email.mime.base import MIMEBase
+from email import encoders
 from typing import Dict, Optional
 from datetime import datetime
-from llm_manager import LLMManager
+
+logger = logging.getLogger('EmailSender')
+
+# 共享的SSL上下文，CA证书只加载一次，所有连接和重连复用
+_SSL_CTX = ssl.create_default_context()
+
+class _DisabledLLM:
+    """LLM功能未启用时使用的占位对象"""
+    
+    def is_enabled(self) -> bool:
+        return False
+    
+    def validate_config(self) -> bool:
+        return True
 
 class EmailSender:
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, llm_manager=None):
         self.config = config
         self.email_config = config['email']
-        self.llm_manager = LLMManager(config)
+        # 优先复用调用方传入的LLM管理器（共享HTTP连接池和缓存）；否则在首次需要分析时
+        # 才导入和创建，未启用时直接使用占位对象
+        self._llm_enabled = bool(config.get('llm', {}).get('enabled', False))
+        if llm_manager is not None:
+            self._llm = llm_manager
+        else:
+            self._llm = None if self._llm_enabled else _DisabledLLM()
         
+        # 复用的SMTP连接，避免每封邮件都重新进行TLS握手和登录
+        self._server = None
+        self._server_lock = threading.Lock()
+    
+    @property
+    def llm_manager(self):
+        """延迟创建LLM管理器，避免启动时导入LLM相关依赖"""
+        if self._llm is None:
+            from llm_manager import LLMManager
+            self._llm = LLMManager(self.config)
+        return self._llm
+    
     def _create_connection(self):
         """创建SMTP连接"""
         try:
             server = smtplib.SMTP_SSL(
                 self.email_config['smtp_server'], 
-                self.email_config['smtp_port']
+                self.email_config['smtp_port'],
+                context=_SSL_CTX
             )
             server.login(
                 self.email_config['sender_email'], 
@@ -26,106 +62,165 @@ class EmailSender:
             )
             return server
         except Exception as e:
-            print(f"邮件服务器连接失败: {str(e)}")
+            logger.error("邮件服务器连接失败: %s", e)
             return None
     
-    def send_screenshot_email(self, screenshot_path: str) -> bool:
-        """发送截图邮件"""
-        if not os.path.exists(screenshot_path):
-            print(f"截图文件不存在: {screenshot_path}")
-            return False
+    def _get_server(self):
+        """获取可复用的SMTP连接，连接失效时自动重连"""
+        if self._server is not None:
+            try:
+                self._server.noop()
+                return self._server
+            except Exception:
+                self._close_server()
         
+        self._server = self._create_connection()
+        return self._server
+    
+    def _close_server(self):
+        """关闭当前SMTP连接"""
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+    
+    def _send_message(self, msg) -> bool:
+        """通过复用的SMTP连接发送邮件"""
+        with self._server_lock:
+            server = self._get_server()
+            if not server:
+                return False
+            
+            try:
+                server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # 连接在检查后被服务器关闭，重连后重试一次
+                self._server = None
+                server = self._get_server()
+                if not server:
+                    return False
+                server.send_message(msg)
+            except Exception:
+                self._close_server()
+                raise
+            return True
+    
+    def close(self):
+        """关闭SMTP连接"""
+        with self._server_lock:
+            self._close_server()
+    
+    def send_screenshot_email(self, screenshot_path: str, analysis: Optional[str] = None,
+                              image_data: Optional[bytes] = None, analysis_attempted: bool = False) -> bool:
+        """发送截图邮件，传入analysis时直接使用该分析结果，不再重复调用LLM；
+        analysis_attempted表示调用方已经分析过（即使失败），此时也不再调用LLM；
+        传入image_data时直接使用内存中的截图数据作为附件"""
         try:
+            basename = os.path.basename(screenshot_path)
+            
+            # 先读取截图附件（直接从文件读入附件负载，不保留额外的中间副本），
+            # 文件不存在时在LLM分析之前就返回
+            subtype = os.path.splitext(basename)[1][1:].lower() or 'png'
+            img = MIMEBase('image', 'jpeg' if subtype == 'jpg' else subtype)
+            if image_data is not None:
+                img.set_payload(image_data)
+            else:
+                with open(screenshot_path, 'rb', buffering=1024 * 1024) as f:
+                    img.set_payload(f.read())
+            encoders.encode_base64(img)
+            img.add_header('Content-Disposition', f'attachment; filename="{basename}"')
+            
+            # 主题和正文使用同一个时间戳
+            ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
             # 创建邮件
             msg = MIMEMultipart()
             msg['From'] = self.email_config['sender_email']
             msg['To'] = self.email_config['receiver_email']
-            msg['Subject'] = f"屏幕截图 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            msg['Subject'] = f"屏幕截图 - {ts}"
             
-            # 使用LLM分析截图（如果启用）
-            llm_analysis = ""
-            if self.llm_manager.is_enabled():
-                print("正在使用LLM分析截图...")
-                analysis_result = self.llm_manager.process_image(screenshot_path)
-                if analysis_result:
-                    llm_analysis = f"\n\n=== LLM分析结果 ===\n{analysis_result}\n=== 分析结束 ==="
-                    print("LLM截图分析完成")
+            # 使用LLM分析截图（如果启用且调用方未提供分析结果）
+            if analysis is None and not analysis_attempted and self.llm_manager.is_enabled():
+                logger.info("正在使用LLM分析截图...")
+                analysis = self.llm_manager.process_image(screenshot_path, image_data)
+                if analysis:
+                    logger.info("LLM截图分析完成")
                 else:
-                    print("LLM截图分析失败")
+                    logger.warning("LLM截图分析失败")
+            llm_analysis = f"\n\n=== LLM分析结果 ===\n{analysis}\n=== 分析结束 ===" if analysis else ""
             
             # 添加邮件正文
             body = f"""自动截图邮件
             
-截图时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-截图文件: {os.path.basename(screenshot_path)}{llm_analysis}
+截图时间: {ts}
+截图文件: {basename}{llm_analysis}
             
 此邮件由屏幕截图工具自动发送。"""
             
             msg.attach(MIMEText(body, 'plain', 'utf-8'))
-            
-            # 添加截图附件
-            with open(screenshot_path, 'rb') as f:
-                img_data = f.read()
-                img = MIMEImage(img_data)
-                img.add_header('Content-Disposition', 
-                             f'attachment; filename="{os.path.basename(screenshot_path)}"')
-                msg.attach(img)
+            msg.attach(img)
             
             # 发送邮件
-            server = self._create_connection()
-            if server:
-                server.send_message(msg)
-                server.quit()
-                print(f"截图邮件发送成功: {screenshot_path}")
+            if self._send_message(msg):
+                logger.info("截图邮件发送成功: %s", screenshot_path)
                 return True
             else:
                 return False
                 
+        except FileNotFoundError:
+            logger.warning("截图文件不存在: %s", screenshot_path)
+            return False
         except Exception as e:
-            print(f"发送截图邮件失败: {str(e)}")
+            logger.error("发送截图邮件失败: %s", e)
             return False
     
-    def send_clipboard_email(self, clipboard_content: str) -> bool:
-        """发送剪贴板内容邮件"""
+    def send_clipboard_email(self, clipboard_content: str, analysis: Optional[str] = None,
+                             analysis_attempted: bool = False) -> bool:
+        """发送剪贴板内容邮件，传入analysis时直接使用该分析结果，不再重复调用LLM；
+        analysis_attempted表示调用方已经分析过（即使失败），此时也不再调用LLM"""
         if not clipboard_content or clipboard_content.strip() == "":
-            print("剪贴板内容为空，无法发送邮件")
+            logger.warning("剪贴板内容为空，无法发送邮件")
             return False
         
         try:
-            # 使用LLM分析剪贴板内容（如果启用）
+            # 记录触发时的时间戳，不受LLM分析耗时影响
+            ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            # 使用LLM分析剪贴板内容（如果启用且调用方未提供分析结果）
+            if analysis is None and not analysis_attempted and self.llm_manager.is_enabled():
+                logger.info("正在使用LLM分析剪贴板内容...")
+                analysis = self.llm_manager.process_text(clipboard_content)
+                if analysis:
+                    logger.info("LLM剪贴板分析完成")
+                else:
+                    logger.warning("LLM剪贴板分析失败")
+            
             email_content = clipboard_content
-            if self.llm_manager.is_enabled():
-                print("正在使用LLM分析剪贴板内容...")
-                analysis_result = self.llm_manager.process_text(clipboard_content)
-                if analysis_result:
-                    email_content = f"""原始内容：
+            if analysis:
+                email_content = f"""原始内容：
 {clipboard_content}
 
 === LLM分析结果 ===
-{analysis_result}
+{analysis}
 === 分析结束 ==="""
-                    print("LLM剪贴板分析完成")
-                else:
-                    print("LLM剪贴板分析失败")
             
             # 创建邮件
             msg = MIMEText(email_content, 'plain', 'utf-8')
             msg['From'] = self.email_config['sender_email']
             msg['To'] = self.email_config['receiver_email']
-            msg['Subject'] = f"剪贴板内容 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            msg['Subject'] = f"剪贴板内容 - {ts}"
             
             # 发送邮件
-            server = self._create_connection()
-            if server:
-                server.send_message(msg)
-                server.quit()
-                print(f"剪贴板邮件发送成功，内容长度: {len(clipboard_content)} 字符")
+            if self._send_message(msg):
+                logger.info("剪贴板邮件发送成功，内容长度: %d 字符", len(clipboard_content))
                 return True
             else:
                 return False
                 
         except Exception as e:
-            print(f"发送剪贴板邮件失败: {str(e)}")
+            logger.error("发送剪贴板邮件失败: %s", e)
             return False
     
     def send_test_email(self) -> bool:
@@ -136,17 +231,14 @@ class EmailSender:
             msg['To'] = self.email_config['receiver_email']
             msg['Subject'] = f"测试邮件 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
             
-            server = self._create_connection()
-            if server:
-                server.send_message(msg)
-                server.quit()
-                print("测试邮件发送成功")
+            if self._send_message(msg):
+                logger.info("测试邮件发送成功")
                 return True
             else:
                 return False
                 
         except Exception as e:
-            print(f"发送测试邮件失败: {str(e)}")
+            logger.error("发送测试邮件失败: %s", e)
             return False
     
     def validate_config(self) -> bool:
@@ -155,13 +247,13 @@ class EmailSender:
         
         for field in required_fields:
             if field not in self.email_config or not self.email_config[field]:
-                print(f"邮件配置缺少必要字段: {field}")
+                logger.error("邮件配置缺少必要字段: %s", field)
                 return False
         
         # 验证LLM配置（如果启用）
-        if not self.llm_manager.validate_config():
-            print("LLM配置验证失败")
+        if self._llm_enabled and not self.llm_manager.validate_config():
+            logger.error("LLM配置验证失败")
             return False
         
-        print("邮件配置验证通过")
+        logger.info("邮件配置验证通过")
         return True
\ No newline at end of file
@@ -1,7 +1,25 @@
 import time
+from collections import deque
 from pynput import keyboard
-from typing import Callable, Dict, List
+from typing import Callable, Dict, Deque, Optional
 import threading
+import logging
+
+logger = logging.getLogger('KeyboardListener')
+
+class _NotifyingListener(keyboard.Listener):
+    """监听线程退出（包括异常退出）时调用stopped_callback"""
+    
+    def __init__(self, stopped_callback: Optional[Callable] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._stopped_callback = stopped_callback
+    
+    def run(self):
+        try:
+            super().run()
+        finally:
+            if self._stopped_callback:
+                self._stopped_callback()
 
 class KeyboardListener:
     def __init__(self, config: Dict):
@@ -9,29 +27,37 @@ class KeyboardListener:
         self.trigger_count = config['hotkeys']['trigger_count']
         self.trigger_timeout = config['hotkeys']['trigger_timeout']
         
-        # 存储按键时间戳
-        self.enter_times: List[float] = []
-        self.shift_times: List[float] = []
+        # 存储按键时间戳（最多保留trigger_count个）
+        self.enter_times: Deque[float] = deque(maxlen=self.trigger_count)
+        self.shift_times: Deque[float] = deque(maxlen=self.trigger_count)
+        
+        # 预先绑定触发键，避免每次按键都查找keyboard.Key属性
+        self._ENTER = keyboard.Key.enter
+        self._SHIFTS = frozenset({keyboard.Key.shift, keyboard.Key.shift_l, keyboard.Key.shift_r})
         
         # 回调函数
         self.screenshot_callback: Callable = None
         self.clipboard_callback: Callable = None
+        self.stopped_callback: Optional[Callable] = None
         
         # 监听器
         self.listener = None
         self.running = False
         
-    def set_callbacks(self, screenshot_callback: Callable, clipboard_callback: Callable):
-        """设置回调函数"""
+    def set_callbacks(self, screenshot_callback: Callable, clipboard_callback: Callable,
+                      stopped_callback: Optional[Callable] = None):
+        """设置回调函数，stopped_callback在监听线程退出时调用"""
         self.screenshot_callback = screenshot_callback
         self.clipboard_callback = clipboard_callback
+        self.stopped_callback = stopped_callback
     
-    def _clean_old_timestamps(self, timestamps: List[float]) -> List[float]:
+    def _clean_old_timestamps(self, timestamps: Deque[float], current_time: float):
         """清理超时的时间戳"""
-        current_time = time.time()
-        return [t for t in timestamps if current_time - t <= self.trigger_timeout]
+        expire_before = current_time - self.trigger_timeout
+        while timestamps and timestamps[0] < expire_before:
+            timestamps.popleft()
     
-    def _check_trigger(self, timestamps: List[float], callback: Callable):
+    def _check_trigger(self, timestamps: Deque[float], callback: Callable):
         """检查是否触发条件"""
         if len(timestamps) >= self.trigger_count and callback:
             # 清空时间戳列表，避免重复触发
@@ -41,47 +67,49 @@ class KeyboardListener:
     
     def _on_key_press(self, key):
         """按键按下事件处理"""
+        # 普通字符键直接返回，监听线程对绝大多数按键只做一次比较
+        if key is not self._ENTER and key not in self._SHIFTS:
+            return
+        
         current_time = time.time()
         
-        try:
-            if key == keyboard.Key.enter:
-                # 清理旧的时间戳
-                self.enter_times = self._clean_old_timestamps(self.enter_times)
-                # 添加新的时间戳
-                self.enter_times.append(current_time)
-                # 检查是否触发截图
-                self._check_trigger(self.enter_times, self.screenshot_callback)
-                
-            elif key == keyboard.Key.shift or key == keyboard.Key.shift_l or key == keyboard.Key.shift_r:
-                # 清理旧的时间戳
-                self.shift_times = self._clean_old_timestamps(self.shift_times)
-                # 添加新的时间戳
-                self.shift_times.append(current_time)
-                # 检查是否触发剪贴板发送
-                self._check_trigger(self.shift_times, self.clipboard_callback)
-                
-        except AttributeError:
-            # 处理特殊按键
-            pass
+        if key is self._ENTER:
+            # 清理旧的时间戳
+            self._clean_old_timestamps(self.enter_times, current_time)
+            # 添加新的时间戳
+            self.enter_times.append(current_time)
+            # 检查是否触发截图
+            self._check_trigger(self.enter_times, self.screenshot_callback)
+        else:
+            # 清理旧的时间戳
+            self._clean_old_timestamps(self.shift_times, current_time)
+            # 添加新的时间戳
+            self.shift_times.append(current_time)
+            # 检查是否触发剪贴板发送
+            self._check_trigger(self.shift_times, self.clipboard_callback)
     
     def start_listening(self):
         """开始监听键盘事件"""
-        if self.running:
+        # 监听线程意外退出时self.running仍为True，需要按实际状态判断是否可以重启
+        if self.is_running():
             return
             
         self.running = True
-        self.listener = keyboard.Listener(on_press=self._on_key_press)
+        self.listener = _NotifyingListener(
+            stopped_callback=self.stopped_callback,
+            on_press=self._on_key_press
+        )
         self.listener.start()
-        print("键盘监听已启动...")
-        print(f"连续按{self.trigger_count}次Enter键进行截图")
-        print(f"连续按{self.trigger_count}次Shift键发送剪贴板内容")
+        logger.info("键盘监听已启动...")
+        logger.info("连续按%d次Enter键进行截图", self.trigger_count)
+        logger.info("连续按%d次Shift键发送剪贴板内容", self.trigger_count)
     
     def stop_listening(self):
         """停止监听键盘事件"""
         if self.listener and self.running:
             self.listener.stop()
             self.running = False
-            print("键盘监听已停止")
+            logger.info("键盘监听已停止")
     
     def is_running(self) -> bool:
         """检查监听器是否正在运行"""
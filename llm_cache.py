@@ -0,0 +1,77 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import Optional
+
+logger = logging.getLogger('LLMCache')
+
+class LLMCache:
+    """LLM响应的精确匹配缓存，持久化到SQLite，最多保留max_rows条最近写入的响应"""
+    
+    def __init__(self, path: str, max_rows: int = 1000):
+        self.path = os.path.expanduser(path)
+        self.max_rows = max_rows
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # 同一连接在截图、剪贴板等多个回调线程间共享，用锁串行化访问
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_created_at ON llm_cache (created_at)"
+        )
+        self._conn.commit()
+        logger.debug("LLM缓存已打开: %s", self.path)
+    
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, image_path: Optional[str] = None,
+                 image_data: Optional[bytes] = None) -> str:
+        """根据提供商、模型、提示词和图片内容生成缓存键"""
+        digest = hashlib.sha256()
+        for part in (provider, model, prompt):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        
+        if image_data is not None:
+            digest.update(image_data)
+        elif image_path:
+            with open(image_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存的响应，未命中时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def set(self, key: str, response: str):
+        """写入响应到缓存，超出max_rows时删除最早写入的响应"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,)
+            )
+            self._conn.commit()
+    
+    def close(self):
+        """关闭缓存数据库"""
+        with self._lock:
+            self._conn.close()
@@ -1,10 +1,77 @@
-import json
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import base64
+import mmap
 import os
-from typing import Dict, Optional, Any, List
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Any, List, Tuple
 from datetime import datetime
-from volcenginesdkarkruntime import Ark
+from llm_cache import LLMCache
+
+logger = logging.getLogger('LLMManager')
+
+# 常见图片格式的文件头，用于识别MIME类型
+_IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+
+def sniff_image_mime(header: bytes) -> str:
+    """根据文件头识别图片的MIME类型，无法识别时按PNG处理（截图默认格式）"""
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mime_type
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/png'
+
+# llm配置中不属于提供商的配置项
+_NON_PROVIDER_KEYS = ('text_model', 'vision_model', 'cache')
+# 内置提供商通过base_url配置服务地址，其余为自定义API提供商
+_BUILTIN_PROVIDERS = ('ollama', 'openai', 'claude', 'doubao')
+
+@dataclass(slots=True)
+class ProviderConfig:
+    """单个LLM提供商的连接配置，在LLMManager初始化时从配置文件解析一次"""
+    name: str
+    base_url: Optional[str] = None
+    api_key: Optional[str] = None
+    timeout: float = 60
+    extra_headers: Dict[str, str] = field(default_factory=dict)
+
+def _build_provider_configs(llm_config: Dict) -> Dict[str, ProviderConfig]:
+    """解析llm配置中各提供商的连接参数"""
+    providers = {}
+    for name, section in llm_config.items():
+        if name in _NON_PROVIDER_KEYS or not isinstance(section, dict):
+            continue
+        providers[name] = ProviderConfig(
+            name=name,
+            # 自定义API提供商使用api_url作为完整的请求地址
+            base_url=section.get('base_url') if name in _BUILTIN_PROVIDERS else section.get('api_url'),
+            api_key=section.get('api_key'),
+            timeout=section.get('timeout', 60),
+            extra_headers=section.get('extra_headers', {})
+        )
+    
+    ollama = providers.setdefault('ollama', ProviderConfig('ollama'))
+    ollama.base_url = ollama.base_url or 'http://localhost:11434'
+    
+    doubao = providers.setdefault('doubao', ProviderConfig('doubao'))
+    doubao.api_key = doubao.api_key or os.environ.get('ARK_API_KEY')
+    doubao.base_url = llm_config.get('doubao', {}).get('base_url', 'https://ark.cn-beijing.volces.com/api/v3')
+    # 支持应用层加密
+    doubao.extra_headers = llm_config.get('doubao', {}).get('extra_headers', {'x-is-encrypted': 'true'})
+    
+    return providers
 
 class LLMManager:
     """LLM管理器，支持多种大语言模型服务"""
@@ -13,24 +80,123 @@ class LLMManager:
         self.config = config
         self.llm_config = config.get('llm', {})
         self.enabled = self.llm_config.get('enabled', False)
+        self._providers = _build_provider_configs(self.llm_config)
+        
+        # 复用HTTP连接（keep-alive），避免每次调用都重新建立TCP/TLS连接；
+        # 连接池大小与批量并发数一致，否则超出的请求会在用完后关闭连接，无法复用
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=max(4, self.llm_config.get('max_concurrency', 4)),
+            max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        # 健康检查使用不重试的独立会话，服务未启动时立即返回，不会因重试退避拖慢启动
+        self._health_session = requests.Session()
+        
+        # LLM响应缓存：提供商、模型、提示词和图片完全相同时直接返回历史结果
+        self._cache = None
+        cache_config = self.llm_config.get('cache', {})
+        if self.enabled and cache_config.get('enabled', True):
+            try:
+                self._cache = LLMCache(cache_config.get('path', '~/.cache/aaai/llm.sqlite'),
+                                       cache_config.get('max_rows', 1000))
+            except Exception as e:
+                logger.error("LLM缓存初始化失败，将不使用缓存: %s", e)
         
+        # SDK客户端在首次调用时创建并复用，避免每次调用都重建连接池和TLS上下文
+        self._clients_lock = threading.Lock()
+        self._openai_client = None
+        self._anthropic_client = None
+        self._ark_client = None
+        
+        # 提供商到调用/检查方法的分发表，未列出的提供商按自定义API处理
+        self._call_dispatch = {
+            'ollama': self._call_ollama,
+            'openai': self._call_openai,
+            'claude': self._call_claude,
+            'doubao': self._call_doubao,
+        }
+        self._health_dispatch = {
+            'ollama': self._check_ollama_availability,
+            'openai': self._check_openai_availability,
+            'claude': self._check_claude_availability,
+            'doubao': self._check_doubao_availability,
+        }
+    
+    def close(self):
+        """关闭响应缓存和HTTP连接池"""
+        cache, self._cache = self._cache, None
+        if cache is not None:
+            cache.close()
+        self._session.close()
+        self._health_session.close()
+    
     def is_enabled(self) -> bool:
         """检查LLM功能是否启用"""
         return self.enabled
     
-    def _encode_image_to_base64(self, image_path: str) -> Optional[str]:
-        """将图片编码为base64格式"""
+    def _encode_image_to_base64(self, image_path: str, image_data: Optional[bytes] = None) -> Optional[Tuple[str, str]]:
+        """将图片编码为base64格式，返回(MIME类型, base64字符串)；已有内存中的图片数据时不再读取文件"""
         try:
+            if image_data is not None:
+                return sniff_image_mime(image_data[:12]), base64.b64encode(image_data).decode('ascii')
             with open(image_path, 'rb') as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
+                # 空文件无法建立映射
+                if os.fstat(image_file.fileno()).st_size == 0:
+                    return 'image/png', ''
+                # 通过内存映射直接编码页缓存中的数据，不再额外复制出一份文件内容
+                with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return sniff_image_mime(mm[:12]), base64.b64encode(mm).decode('ascii')
         except Exception as e:
-            print(f"图片编码失败: {str(e)}")
+            logger.error("图片编码失败: %s", e)
             return None
     
-    def _call_ollama(self, model: str, prompt: str, image_path: Optional[str] = None) -> Optional[str]:
+    def _provider(self, name: str) -> ProviderConfig:
+        """获取提供商配置，未配置的提供商返回默认空配置"""
+        cfg = self._providers.get(name)
+        return cfg if cfg is not None else ProviderConfig(name)
+    
+    def _get_openai_client(self):
+        """获取复用的OpenAI客户端"""
+        with self._clients_lock:
+            if self._openai_client is None:
+                import openai
+                cfg = self._provider('openai')
+                self._openai_client = openai.OpenAI(
+                    api_key=cfg.api_key,
+                    base_url=cfg.base_url
+                )
+            return self._openai_client
+    
+    def _get_anthropic_client(self):
+        """获取复用的Claude客户端"""
+        with self._clients_lock:
+            if self._anthropic_client is None:
+                import anthropic
+                self._anthropic_client = anthropic.Anthropic(
+                    api_key=self._provider('claude').api_key
+                )
+            return self._anthropic_client
+    
+    def _get_ark_client(self):
+        """获取复用的豆包（火山方舟）客户端"""
+        with self._clients_lock:
+            if self._ark_client is None:
+                from volcenginesdkarkruntime import Ark
+                cfg = self._provider('doubao')
+                self._ark_client = Ark(
+                    base_url=cfg.base_url,
+                    api_key=cfg.api_key
+                )
+            return self._ark_client
+    
+    def _call_ollama(self, model: str, prompt: str, image_path: Optional[str] = None, encoded: Optional[Tuple[str, str]] = None) -> Optional[str]:
         """调用Ollama本地模型"""
         try:
-            url = f"{self.llm_config['ollama']['base_url']}/api/generate"
+            cfg = self._provider('ollama')
+            url = f"{cfg.base_url}/api/generate"
             
             payload = {
                 "model": model,
@@ -40,38 +206,35 @@ class LLMManager:
             
             # 如果有图片，添加图片数据（多模态）
             if image_path:
-                image_base64 = self._encode_image_to_base64(image_path)
-                if image_base64:
+                if encoded:
+                    mime_type, image_base64 = encoded
                     payload["images"] = [image_base64]
             
-            # 从配置中获取超时时间，默认为60秒
-            timeout = self.llm_config.get('ollama', {}).get('timeout', 60)
-            response = requests.post(url, json=payload, timeout=timeout)
+            # 使用orjson编解码请求和响应体，多模态请求/响应可达数MB
+            response = self._session.post(
+                url, data=orjson.dumps(payload),
+                headers={'Content-Type': 'application/json'}, timeout=cfg.timeout
+            )
             response.raise_for_status()
             
-            result = response.json()
+            result = orjson.loads(response.content)
             return result.get('response', '')
             
         except Exception as e:
-            print(f"Ollama调用失败: {str(e)}")
+            logger.error("Ollama调用失败: %s", e)
             return None
     
-    def _call_openai(self, model: str, prompt: str, image_path: Optional[str] = None) -> Optional[str]:
+    def _call_openai(self, model: str, prompt: str, image_path: Optional[str] = None, encoded: Optional[Tuple[str, str]] = None) -> Optional[str]:
         """调用OpenAI API"""
         try:
-            import openai
-            
-            client = openai.OpenAI(
-                api_key=self.llm_config['openai']['api_key'],
-                base_url=self.llm_config['openai'].get('base_url')
-            )
+            client = self._get_openai_client()
             
             messages = []
             
             if image_path:
                 # 多模态消息
-                image_base64 = self._encode_image_to_base64(image_path)
-                if image_base64:
+                if encoded:
+                    mime_type, image_base64 = encoded
                     messages.append({
                         "role": "user",
                         "content": [
@@ -79,7 +242,7 @@ class LLMManager:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_base64}"
+                                    "url": f"data:{mime_type};base64,{image_base64}"
                                 }
                             }
                         ]
@@ -99,24 +262,20 @@ class LLMManager:
             return response.choices[0].message.content
             
         except Exception as e:
-            print(f"OpenAI调用失败: {str(e)}")
+            logger.error("OpenAI调用失败: %s", e)
             return None
     
-    def _call_claude(self, model: str, prompt: str, image_path: Optional[str] = None) -> Optional[str]:
+    def _call_claude(self, model: str, prompt: str, image_path: Optional[str] = None, encoded: Optional[Tuple[str, str]] = None) -> Optional[str]:
         """调用Claude API"""
         try:
-            import anthropic
-            
-            client = anthropic.Anthropic(
-                api_key=self.llm_config['claude']['api_key']
-            )
+            client = self._get_anthropic_client()
             
             messages = []
             
             if image_path:
                 # 多模态消息
-                image_base64 = self._encode_image_to_base64(image_path)
-                if image_base64:
+                if encoded:
+                    mime_type, image_base64 = encoded
                     messages.append({
                         "role": "user",
                         "content": [
@@ -125,7 +284,7 @@ class LLMManager:
                                 "type": "image",
                                 "source": {
                                     "type": "base64",
-                                    "media_type": "image/jpeg",
+                                    "media_type": mime_type,
                                     "data": image_base64
                                 }
                             }
@@ -146,24 +305,19 @@ class LLMManager:
             return response.content[0].text
             
         except Exception as e:
-            print(f"Claude调用失败: {str(e)}")
+            logger.error("Claude调用失败: %s", e)
             return None
     
-    def _call_doubao(self, model: str, prompt: str, image_path: Optional[str] = None) -> Optional[str]:
+    def _call_doubao(self, model: str, prompt: str, image_path: Optional[str] = None, encoded: Optional[Tuple[str, str]] = None) -> Optional[str]:
         """调用豆包API"""
         try:
-            doubao_config = self.llm_config.get('doubao', {})
-            api_key = doubao_config.get('api_key') or os.environ.get('ARK_API_KEY')
-            base_url = doubao_config.get('base_url', 'https://ark.cn-beijing.volces.com/api/v3')
+            cfg = self._provider('doubao')
             
-            if not api_key:
-                print("豆包API密钥未配置")
+            if not cfg.api_key:
+                logger.warning("豆包API密钥未配置")
                 return None
             
-            client = Ark(
-                base_url=base_url,
-                api_key=api_key
-            )
+            client = self._get_ark_client()
             
             messages = []
             
@@ -174,9 +328,9 @@ class LLMManager:
                     image_url = image_path
                 else:
                     # 如果是本地文件路径，转换为base64
-                    image_base64 = self._encode_image_to_base64(image_path)
-                    if image_base64:
-                        image_url = f'data:image/jpeg;base64,{image_base64}'
+                    if encoded:
+                        mime_type, image_base64 = encoded
+                        image_url = f'data:{mime_type};base64,{image_base64}'
                     else:
                         messages.append({'role': 'user', 'content': prompt})
                         image_url = None
@@ -200,34 +354,30 @@ class LLMManager:
                 # 纯文本消息
                 messages.append({'role': 'user', 'content': prompt})
             
-            # 支持应用层加密
-            extra_headers = doubao_config.get('extra_headers', {'x-is-encrypted': 'true'})
-            
             response = client.chat.completions.create(
                 model=model,
                 messages=messages,
-                extra_headers=extra_headers
+                extra_headers=cfg.extra_headers
             )
             
             return response.choices[0].message.content
             
         except Exception as e:
-            print(f"豆包调用失败: {str(e)}")
+            logger.error("豆包调用失败: %s", e)
             return None
     
-    def _call_custom_api(self, provider: str, model: str, prompt: str, image_path: Optional[str] = None) -> Optional[str]:
+    def _call_custom_api(self, provider: str, model: str, prompt: str, image_path: Optional[str] = None, encoded: Optional[Tuple[str, str]] = None) -> Optional[str]:
         """调用自定义API（千问等）"""
         try:
-            provider_config = self.llm_config.get(provider, {})
-            url = provider_config.get('api_url')
-            api_key = provider_config.get('api_key')
+            cfg = self._provider(provider)
             
-            if not url or not api_key:
-                print(f"{provider}配置不完整")
+            if not cfg.base_url or not cfg.api_key:
+                logger.warning("%s配置不完整", provider)
                 return None
             
             headers = {
-                'Authorization': f'Bearer {api_key}',
+                **cfg.extra_headers,
+                'Authorization': f'Bearer {cfg.api_key}',
                 'Content-Type': 'application/json'
             }
             
@@ -238,8 +388,8 @@ class LLMManager:
             
             if image_path:
                 # 多模态消息
-                image_base64 = self._encode_image_to_base64(image_path)
-                if image_base64:
+                if encoded:
+                    mime_type, image_base64 = encoded
                     payload['messages'].append({
                         'role': 'user',
                         'content': [
@@ -247,7 +397,7 @@ class LLMManager:
                             {
                                 'type': 'image_url',
                                 'image_url': {
-                                    'url': f'data:image/jpeg;base64,{image_base64}'
+                                    'url': f'data:{mime_type};base64,{image_base64}'
                                 }
                             }
                         ]
@@ -258,18 +408,50 @@ class LLMManager:
                 # 纯文本消息
                 payload['messages'].append({'role': 'user', 'content': prompt})
             
-            # 从配置中获取超时时间，默认为60秒
-            timeout = self.llm_config.get('ollama', {}).get('timeout', 60)
-            response = requests.post(url, json=payload, headers=headers, timeout=timeout)
+            # 使用该提供商自己的超时配置，默认为60秒
+            response = self._session.post(cfg.base_url, data=orjson.dumps(payload), headers=headers, timeout=cfg.timeout)
             response.raise_for_status()
             
-            result = response.json()
+            result = orjson.loads(response.content)
             return result.get('choices', [{}])[0].get('message', {}).get('content', '')
             
         except Exception as e:
-            print(f"{provider}调用失败: {str(e)}")
+            logger.error("%s调用失败: %s", provider, e)
             return None
     
+    def _dispatch(self, provider: str, model: str, prompt: str, image_path: Optional[str] = None, encoded: Optional[Tuple[str, str]] = None) -> Optional[str]:
+        """将请求分发到对应的提供商"""
+        handler = self._call_dispatch.get(provider)
+        if handler is None:
+            # 自定义API提供商
+            return self._call_custom_api(provider, model, prompt, image_path, encoded)
+        return handler(model, prompt, image_path, encoded)
+    
+    def _cached_call(self, provider: str, model: str, prompt: str, image_path: Optional[str] = None, image_data: Optional[bytes] = None,
+                     encoded: Optional[Tuple[str, str]] = None) -> Optional[str]:
+        """先查询响应缓存，未命中时调用模型并写入缓存；encoded为调用方已编码好的(MIME类型, base64)图片"""
+        if self._cache is None:
+            return self._dispatch(provider, model, prompt, image_path, encoded)
+        
+        try:
+            key = LLMCache.make_key(provider, model, prompt, image_path, image_data)
+            cached = self._cache.get(key)
+        except Exception as e:
+            logger.error("LLM缓存读取失败: %s", e)
+            return self._dispatch(provider, model, prompt, image_path, encoded)
+        
+        if cached is not None:
+            logger.debug("命中LLM响应缓存")
+            return cached
+        
+        result = self._dispatch(provider, model, prompt, image_path, encoded)
+        if result:
+            try:
+                self._cache.set(key, result)
+            except Exception as e:
+                logger.error("LLM缓存写入失败: %s", e)
+        return result
+    
     def process_text(self, text: str) -> Optional[str]:
         """处理文本内容（使用文字模型）"""
         if not self.is_enabled():
@@ -282,29 +464,33 @@ class LLMManager:
             prompt_template = text_config.get('prompt', '请分析以下内容：{content}')
             
             if not provider or not model:
-                print("文字模型配置不完整")
+                logger.warning("文字模型配置不完整")
                 return None
             
             prompt = prompt_template.format(content=text)
             
-            if provider == 'ollama':
-                return self._call_ollama(model, prompt)
-            elif provider == 'openai':
-                return self._call_openai(model, prompt)
-            elif provider == 'claude':
-                return self._call_claude(model, prompt)
-            elif provider == 'doubao':
-                return self._call_doubao(model, prompt)
-            else:
-                # 自定义API提供商
-                return self._call_custom_api(provider, model, prompt)
+            return self._cached_call(provider, model, prompt)
                 
         except Exception as e:
-            print(f"文本处理失败: {str(e)}")
+            logger.error("文本处理失败: %s", e)
             return None
     
-    def process_image(self, image_path: str) -> Optional[str]:
-        """处理图片内容（使用多模态模型）"""
+    def process_text_batch(self, texts: List[str]) -> List[Optional[str]]:
+        """并发处理多段文本，返回结果与输入顺序一致"""
+        if not self.is_enabled() or not texts:
+            return [None] * len(texts)
+        
+        # 单条文本（未配置batch_window时的常见情况）直接在当前线程处理，不为此创建线程池
+        if len(texts) == 1:
+            return [self.process_text(texts[0])]
+        
+        # 同时进行的请求数受max_concurrency限制，避免触发提供商的限流
+        max_workers = max(1, min(self.llm_config.get('max_concurrency', 4), len(texts)))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='LLMBatch') as executor:
+            return list(executor.map(self.process_text, texts))
+    
+    def process_image(self, image_path: str, image_data: Optional[bytes] = None) -> Optional[str]:
+        """处理图片内容（使用多模态模型），image_data为截图的原始字节，提供时不再读取文件"""
         if not self.is_enabled():
             return None
         
@@ -315,23 +501,18 @@ class LLMManager:
             prompt_template = vision_config.get('prompt', '请分析这张图片中的内容，特别是如果这是一道题目，请提供详细的解答。')
             
             if not provider or not model:
-                print("多模态模型配置不完整")
+                logger.warning("多模态模型配置不完整")
                 return None
             
-            if provider == 'ollama':
-                return self._call_ollama(model, prompt_template, image_path)
-            elif provider == 'openai':
-                return self._call_openai(model, prompt_template, image_path)
-            elif provider == 'claude':
-                return self._call_claude(model, prompt_template, image_path)
-            elif provider == 'doubao':
-                return self._call_doubao(model, prompt_template, image_path)
-            else:
-                # 自定义API提供商
-                return self._call_custom_api(provider, model, prompt_template, image_path)
+            # 图片只编码一次，由调用方显式传给各提供商；URL图片由提供商直接引用
+            encoded = None
+            if not image_path.startswith(('http://', 'https://')):
+                encoded = self._encode_image_to_base64(image_path, image_data)
+            
+            return self._cached_call(provider, model, prompt_template, image_path, image_data, encoded)
                 
         except Exception as e:
-            print(f"图片处理失败: {str(e)}")
+            logger.error("图片处理失败: %s", e)
             return None
     
     def check_availability(self) -> bool:
@@ -355,125 +536,120 @@ class LLMManager:
             if vision_provider:
                 providers_to_check.add(vision_provider)
             
-            # 检查每个提供商的可用性
-            for provider in providers_to_check:
-                if not self._check_provider_availability(provider):
-                    return False
-            
-            return True
+            if not providers_to_check:
+                return True
+            
+            # 并发检查每个提供商的可用性，总耗时取决于最慢的一个而不是所有耗时之和
+            executor = ThreadPoolExecutor(max_workers=len(providers_to_check), thread_name_prefix='LLMCheck')
+            try:
+                futures = [executor.submit(self._check_provider_availability, p) for p in providers_to_check]
+                for future in as_completed(futures):
+                    if not future.result():
+                        return False
+                return True
+            finally:
+                # 有提供商不可用时立即返回，不等待其余检查完成
+                executor.shutdown(wait=False, cancel_futures=True)
             
         except Exception as e:
-            print(f"LLM可用性检查失败: {str(e)}")
+            logger.error("LLM可用性检查失败: %s", e)
             return False
     
     def _check_provider_availability(self, provider: str) -> bool:
         """检查特定提供商的可用性"""
         try:
-            if provider == 'ollama':
-                return self._check_ollama_availability()
-            elif provider == 'openai':
-                return self._check_openai_availability()
-            elif provider == 'claude':
-                return self._check_claude_availability()
-            elif provider == 'doubao':
-                return self._check_doubao_availability()
-            else:
+            handler = self._health_dispatch.get(provider)
+            if handler is None:
                 # 自定义API提供商
                 return self._check_custom_api_availability(provider)
+            return handler()
         except Exception as e:
-            print(f"{provider}可用性检查失败: {str(e)}")
+            logger.error("%s可用性检查失败: %s", provider, e)
             return False
     
     def _check_ollama_availability(self) -> bool:
         """检查Ollama服务可用性"""
         try:
-            base_url = self.llm_config.get('ollama', {}).get('base_url', 'http://localhost:11434')
-            # 从配置中获取超时时间，默认为5秒（健康检查用较短超时）
-            timeout = self.llm_config.get('ollama', {}).get('timeout', 60)
+            cfg = self._provider('ollama')
             # 健康检查使用较短的超时时间
-            health_timeout = min(timeout, 10)  # 最多10秒
-            response = requests.get(f"{base_url}/api/tags", timeout=health_timeout)
+            health_timeout = min(cfg.timeout, 10)  # 最多10秒
+            response = self._health_session.get(f"{cfg.base_url}/api/tags", timeout=health_timeout)
             return response.status_code == 200
         except Exception as e:
-            print(f"Ollama连接失败: {str(e)}")
+            logger.error("Ollama连接失败: %s", e)
             return False
     
     def _check_openai_availability(self) -> bool:
         """检查OpenAI API可用性"""
         try:
-            api_key = self.llm_config.get('openai', {}).get('api_key')
+            api_key = self._provider('openai').api_key
             if not api_key or api_key == 'your_openai_api_key':
-                print("OpenAI API密钥未配置")
+                logger.warning("OpenAI API密钥未配置")
                 return False
             return True
         except Exception as e:
-            print(f"OpenAI配置检查失败: {str(e)}")
+            logger.error("OpenAI配置检查失败: %s", e)
             return False
     
     def _check_claude_availability(self) -> bool:
         """检查Claude API可用性"""
         try:
-            api_key = self.llm_config.get('claude', {}).get('api_key')
+            api_key = self._provider('claude').api_key
             if not api_key or api_key == 'your_claude_api_key':
-                print("Claude API密钥未配置")
+                logger.warning("Claude API密钥未配置")
                 return False
             return True
         except Exception as e:
-            print(f"Claude配置检查失败: {str(e)}")
+            logger.error("Claude配置检查失败: %s", e)
             return False
     
     def _check_doubao_availability(self) -> bool:
         """检查豆包API可用性"""
         try:
-            doubao_config = self.llm_config.get('doubao', {})
-            api_key = doubao_config.get('api_key') or os.environ.get('ARK_API_KEY')
-            
-            if not api_key:
-                print("豆包API密钥未配置")
+            if not self._provider('doubao').api_key:
+                logger.warning("豆包API密钥未配置")
                 return False
             
             return True
         except Exception as e:
-            print(f"豆包配置检查失败: {str(e)}")
+            logger.error("豆包配置检查失败: %s", e)
             return False
     
     def _check_custom_api_availability(self, provider: str) -> bool:
         """检查自定义API可用性"""
         try:
-            provider_config = self.llm_config.get(provider, {})
-            api_key = provider_config.get('api_key')
-            api_url = provider_config.get('api_url')
+            cfg = self._provider(provider)
             
-            if not api_key or not api_url:
-                print(f"{provider}配置不完整")
+            if not cfg.api_key or not cfg.base_url:
+                logger.warning("%s配置不完整", provider)
                 return False
             
             return True
         except Exception as e:
-            print(f"{provider}配置检查失败: {str(e)}")
+            logger.error("%s配置检查失败: %s", provider, e)
             return False
 
     def validate_config(self) -> bool:
         """验证LLM配置"""
         if not self.llm_config:
-            print("LLM配置为空")
+            logger.warning("LLM配置为空")
             return False
         
         if not self.llm_config.get('enabled', False):
-            print("LLM功能未启用")
+            logger.info("LLM功能未启用")
             return True  # 未启用不算错误
         
         # 检查文字模型配置
         text_config = self.llm_config.get('text_model', {})
         if not text_config.get('provider') or not text_config.get('model'):
-            print("文字模型配置不完整")
+            logger.warning("文字模型配置不完整")
             return False
         
         # 检查多模态模型配置
         vision_config = self.llm_config.get('vision_model', {})
         if not vision_config.get('provider') or not vision_config.get('model'):
-            print("多模态模型配置不完整")
+            logger.warning("多模态模型配置不完整")
             return False
         
-        print("LLM配置验证通过")
+        logger.info("LLM配置验证通过")
         return True
\ No newline at end of file
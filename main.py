@@ -1,17 +1,74 @@
 import json
+import orjson
 import os
 import sys
-import time
 import signal
 import threading
+import atexit
 import logging
+import logging.handlers
+import queue
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, Optional
 from keyboard_listener import KeyboardListener
 from screenshot import ScreenshotManager
 from clipboard_manager import ClipboardManager
 from email_sender import EmailSender
 from llm_manager import LLMManager
-from web_server import start_server
+import web_server
+from web_server import start_server, allow_link_source
+
+# 启动信息和分隔线只在模块加载时构造一次
+_SEP = "-" * 40
+
+# 请求体由orjson预先编码为bytes，需手动声明类型
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+LOGO = """
+╔══════════════════════════════════════════════════════════════════════════════╗
+║                                                                              ║
+║     █████╗  █████╗  █████╗ ██╗                                             ║
+║    ██╔══██╗██╔══██╗██╔══██╗██║                                             ║
+║    ███████║███████║███████║██║                                             ║
+║    ██╔══██║██╔══██║██╔══██║██║                                             ║
+║    ██║  ██║██║  ██║██║  ██║██║                                             ║
+║    ╚═╝  ╚═╝╚═╝  ╚═╝╚═╝  ╚═╝╚═╝                                             ║
+║                                                                              ║
+║           Another AI Assistant for Interview (AAAI)                         ║
+║                     智能面试助手 - 屏幕截图与分析工具                          ║
+║                                                                              ║
+║    🎯 功能特性:                                                               ║
+║       • 智能截图分析 - AI驱动的图像理解                                        ║
+║       • 剪贴板监控 - 自动文本分析与处理                                        ║
+║       • Web界面管理 - 实时查看分析结果                                         ║
+║       • 邮件通知 - 自动发送分析报告                                           ║
+║                                                                              ║
+╚══════════════════════════════════════════════════════════════════════════════╝
+"""
+
+OPERATION_GUIDE = """
+╔══════════════════════════════════════════════════════════════════════════════╗
+║                              🚀 系统已就绪                                   ║
+╠══════════════════════════════════════════════════════════════════════════════╣
+║                                                                              ║
+║  📖 操作指南:                                                                 ║
+║                                                                              ║
+║     ⌨️  截图功能:    连续按 3 次 Enter 键                                     ║
+║     📋 剪贴板功能:   连续按 3 次 Shift 键                                     ║
+║     🌐 Web界面:     http://localhost:8000                                   ║
+║     📧 邮件通知:     自动发送分析结果                                          ║
+║                                                                              ║
+║  💡 提示: 按 Ctrl+C 可安全退出程序                                            ║
+║                                                                              ║
+║  🔄 程序正在后台运行，等待您的操作...                                          ║
+║                                                                              ║
+╚══════════════════════════════════════════════════════════════════════════════╝
+"""
 
 # 自定义日志格式化器，支持彩色输出
 class ColoredFormatter(logging.Formatter):
@@ -27,19 +84,21 @@ class ColoredFormatter(logging.Formatter):
         'RESET': '\033[0m'      # 重置
     }
     
+    # 带有这些符号的状态消息即使是INFO级别也着色
+    _SYMBOLS = ('✓', '✗', '⚠')
+    
     def format(self, record):
         # 获取原始消息
         message = super().format(record)
         
-        # 根据日志级别添加颜色
-        if record.levelname in self.COLORS:
-            color = self.COLORS[record.levelname]
-            reset = self.COLORS['RESET']
-            # 只对特定的消息添加颜色，保持输出的美观
-            if any(symbol in message for symbol in ['✓', '✗', '⚠']):
-                return f"{color}{message}{reset}"
-            elif record.levelname in ['ERROR', 'WARNING']:
-                return f"{color}{message}{reset}"
+        # 根据日志级别添加颜色：WARNING/ERROR总是着色；其他级别只对带状态符号的消息着色，
+        # 符号都写在消息模板里，只需检查未格式化的record.msg，不必扫描格式化后的整行
+        color = self.COLORS.get(record.levelname)
+        if color is None:
+            return message
+        if record.levelno in (logging.WARNING, logging.ERROR) or (
+                isinstance(record.msg, str) and any(symbol in record.msg for symbol in self._SYMBOLS)):
+            return f"{color}{message}{self.COLORS['RESET']}"
         
         return message
 
@@ -64,63 +123,126 @@ def setup_logging():
     file_handler.setFormatter(logging.Formatter(log_format))
     
     # 创建控制台处理器（显示INFO及以上级别，使用彩色格式）
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(ColoredFormatter(console_format))
+    # --windowed打包运行时没有stdout，使用NullHandler丢弃控制台输出
+    if sys.stdout is None:
+        console_handler = logging.NullHandler()
+    else:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(ColoredFormatter(console_format))
     
-    # 配置根日志器
+    # 配置根日志器：调用线程只把日志记录放入队列，由后台线程统一写文件和控制台，
+    # 避免在热键回调和LLM调用线程中同步写盘、刷新stdout
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
     logging.basicConfig(
         level=logging.DEBUG,
-        handlers=[file_handler, console_handler]
+        handlers=[logging.handlers.QueueHandler(log_queue)]
     )
     
     # 创建应用专用日志器
     logger = logging.getLogger('ScreenCaptureApp')
     # 只在文件中记录初始化信息
-    logger.debug(f"日志系统初始化完成，日志文件: {log_filename}")
+    logger.debug("日志系统初始化完成，日志文件: %s", log_filename)
     return logger
 
 # 初始化日志系统
 logger = setup_logging()
 
+@dataclass(frozen=True)
+class RuntimeSettings:
+    """加载配置时解析一次的运行参数，触发回调中只做属性访问"""
+    web_enabled: bool
+    web_host: str
+    web_port: int
+    web_url_screenshot: str
+    web_url_screenshot_raw: str
+    web_url_clipboard: str
+    web_url_results: str
+    web_max_results: int
+    email_enabled: bool
+    batch_window: float
+    
+    @classmethod
+    def from_config(cls, config: Dict) -> 'RuntimeSettings':
+        web_config = config.get('web_service', {})
+        host = web_config.get('host', '0.0.0.0')
+        port = web_config.get('port', 8000)
+        # 如果host是0.0.0.0，发送请求时使用localhost
+        request_host = 'localhost' if host == '0.0.0.0' else host
+        web_base = f"http://{request_host}:{port}"
+        
+        return cls(
+            web_enabled=web_config.get('enabled', True),
+            web_host=host,
+            web_port=port,
+            web_url_screenshot=f"{web_base}/api/screenshot",
+            web_url_screenshot_raw=f"{web_base}/api/screenshot/raw",
+            web_url_clipboard=f"{web_base}/api/clipboard",
+            web_url_results=f"{web_base}/api/results",
+            web_max_results=web_config.get('max_results', 100),
+            email_enabled=config.get('email', {}).get('enabled', True),
+            batch_window=config.get('llm', {}).get('batch_window', 0)
+        )
+
 class ScreenCaptureApp:
     def __init__(self):
         self.config = None
+        self.settings: Optional[RuntimeSettings] = None
         self.keyboard_listener = None
         self.screenshot_manager = None
         self.clipboard_manager = None
         self.email_sender = None
         self.llm_manager = None
         self.web_server_thread = None
+        # Web服务在本进程中运行时，直接写入其结果存储，不再经过本机HTTP请求
+        self._web_in_process = False
+        # 向本地Web服务推送数据时复用keep-alive连接
+        self._http = requests.Session()
+        # 连接池大小与回调线程池一致，并发推送时每个请求都能取到空闲的keep-alive连接
+        self._http.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        # 触发回调中并行执行Web推送、邮件发送等IO任务
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='Dispatch')
+        # 连续的剪贴板触发先缓存，合并为一次批量分析
+        self._clipboard_pending = []
+        self._clipboard_lock = threading.Lock()
+        self._clipboard_timer = None
         self.running = False
+        # 停止程序或键盘监听线程退出时唤醒主循环
+        self._wake_event = threading.Event()
         self.logger = logging.getLogger('ScreenCaptureApp')
         self.logger.debug("ScreenCaptureApp实例初始化完成")
         
     def load_config(self, config_path="config.json"):
         """加载配置文件"""
-        self.logger.debug(f"开始加载配置文件: {config_path}")
+        self.logger.debug("开始加载配置文件: %s", config_path)
         try:
             if not os.path.exists(config_path):
-                self.logger.error(f"配置文件不存在: {config_path}")
-                self.logger.error(f"配置文件不存在: {config_path}")
+                self.logger.error("配置文件不存在: %s", config_path)
                 return False
                 
-            with open(config_path, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
+            with open(config_path, 'rb') as f:
+                self.config = orjson.loads(f.read())
+            self.settings = RuntimeSettings.from_config(self.config)
             
             self.logger.debug("配置文件加载成功")
-            self.logger.debug(f"配置内容: {json.dumps(self.config, ensure_ascii=False, indent=2)}")
+            # 序列化整个配置开销较大，只在DEBUG级别启用时执行
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("配置内容: %s", json.dumps(self.config, ensure_ascii=False, indent=2))
             self.logger.info("配置文件加载成功")
             return True
         except Exception as e:
-            self.logger.error(f"加载配置文件失败: {str(e)}", exc_info=True)
-            self.logger.error(f"加载配置文件失败: {str(e)}")
+            self.logger.error("加载配置文件失败: %s", e, exc_info=True)
             return False
     
     def initialize_components(self):
         """初始化各个组件"""
         self.logger.info("\n正在初始化组件...")
-        self.logger.info("-" * 40)
+        self.logger.info(_SEP)
         
         try:
             # 初始化截图管理器
@@ -131,67 +253,78 @@ class ScreenCaptureApp:
             self.logger.info("[2/6] 初始化剪贴板管理器... ✓ 成功")
             self.clipboard_manager = ClipboardManager()
             
-            # 初始化邮件发送器
-            self.logger.info("[3/6] 初始化邮件发送器... ✓ 成功")
-            self.email_sender = EmailSender(self.config)
-            
-            # 验证邮件配置（如果启用）
-            if self.config.get('email', {}).get('enabled', True):
-                self.logger.info("[4/6] 验证邮件配置...")
-                if not self.email_sender.validate_config():
-                    self.logger.error("✗ 失败")
-                    self.logger.error("    邮件配置验证失败，请检查config.json文件")
-                    return False
-                self.logger.info("✓ 成功")
-            else:
-                self.logger.info("[4/6] 邮件功能已禁用，跳过验证")
-            
             # 初始化LLM管理器
-            self.logger.info("[5/6] 初始化LLM管理器... ✓ 成功")
+            self.logger.info("[3/6] 初始化LLM管理器... ✓ 成功")
             self.llm_manager = LLMManager(self.config)
             
-            # 检查LLM可用性
-            self.logger.info("[6/6] 检查LLM服务可用性...")
-            llm_status = self.check_llm_availability()
-            if llm_status:
-                self.logger.info("✓ 可用")
+            # 初始化邮件发送器：未启用时不创建；启用时与主程序共用同一个LLM管理器，
+            # 避免邮件发送器再创建一套HTTP连接池和缓存连接
+            if self.settings.email_enabled:
+                self.logger.info("[4/6] 初始化邮件发送器... ✓ 成功")
+                self.email_sender = EmailSender(self.config, self.llm_manager)
             else:
-                self.logger.warning("⚠ 不可用")
-                self.logger.warning("    LLM服务不可用，将跳过AI分析功能")
-                self.logger.warning("    请检查Ollama服务是否启动或API配置是否正确")
+                self.logger.info("[4/6] 邮件功能已禁用，跳过初始化邮件发送器")
             
             # 初始化键盘监听器
             self.keyboard_listener = KeyboardListener(self.config)
             self.keyboard_listener.set_callbacks(
                 self.on_screenshot_trigger,
-                self.on_clipboard_trigger
+                self.on_clipboard_trigger,
+                self._wake_event.set
             )
             
-            # 启动Web服务（如果启用）
-            web_service_config = self.config.get('web_service', {})
-            if web_service_config.get('enabled', True):
-                self.logger.info("[7/7] 启动Web服务...")
-                self.logger.debug("Web服务已启用，开始启动")
-                try:
-                    self.start_web_service()
+            # 邮件配置验证、LLM可用性检查和Web服务启动都包含网络等待，并行执行；
+            # Web服务在邮件配置验证通过后才启动，验证失败时不会留下已启动的服务。
+            # 结果仍按固定顺序输出日志
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix='Init') as init_executor:
+                email_future = init_executor.submit(self.email_sender.validate_config) if self.settings.email_enabled else None
+                llm_future = init_executor.submit(self.check_llm_availability)
+                
+                # 验证邮件配置（如果启用）
+                if email_future is not None:
+                    self.logger.info("[5/6] 验证邮件配置...")
+                    if not email_future.result():
+                        self.logger.error("✗ 失败")
+                        self.logger.error("    邮件配置验证失败，请检查config.json文件")
+                        return False
                     self.logger.info("✓ 成功")
-                    self.logger.debug("Web服务启动成功")
-                except Exception as e:
-                    self.logger.error("✗ 失败")
-                    self.logger.error(f"Web服务启动失败: {str(e)}", exc_info=True)
-                    self.logger.error(f"    Web服务启动失败: {str(e)}")
-                    return False
-            else:
-                self.logger.info("[7/7] Web服务已禁用，跳过启动")
-                self.logger.debug("Web服务已禁用，跳过启动")
+                else:
+                    self.logger.info("[5/6] 邮件功能已禁用，跳过验证")
+                
+                web_future = init_executor.submit(self.start_web_service) if self.settings.web_enabled else None
+                
+                # 检查LLM可用性
+                self.logger.info("[6/6] 检查LLM服务可用性...")
+                if llm_future.result():
+                    self.logger.info("✓ 可用")
+                else:
+                    self.logger.warning("⚠ 不可用")
+                    self.logger.warning("    LLM服务不可用，将跳过AI分析功能")
+                    self.logger.warning("    请检查Ollama服务是否启动或API配置是否正确")
+                
+                # 启动Web服务（如果启用）
+                if web_future is not None:
+                    self.logger.info("[7/7] 启动Web服务...")
+                    self.logger.debug("Web服务已启用，开始启动")
+                    try:
+                        web_future.result()
+                        self.logger.info("✓ 成功")
+                        self.logger.debug("Web服务启动成功")
+                    except Exception as e:
+                        self.logger.error("✗ 失败")
+                        self.logger.error("    Web服务启动失败: %s", e, exc_info=True)
+                        return False
+                else:
+                    self.logger.info("[7/7] Web服务已禁用，跳过启动")
+                    self.logger.debug("Web服务已禁用，跳过启动")
             
-            self.logger.info("-" * 40)
+            self.logger.info(_SEP)
             self.logger.info("所有组件初始化完成")
             return True
             
         except Exception as e:
-            self.logger.error(f"✗ 失败")
-            self.logger.error(f"组件初始化失败: {str(e)}")
+            self.logger.error("✗ 失败")
+            self.logger.error("组件初始化失败: %s", e)
             return False
     
     def check_llm_availability(self) -> bool:
@@ -208,127 +341,193 @@ class ScreenCaptureApp:
             return self.llm_manager.check_availability()
             
         except Exception as e:
-            self.logger.error(f"    LLM可用性检查失败: {str(e)}")
+            self.logger.error("    LLM可用性检查失败: %s", e)
             return False
     
     def start_web_service(self):
         """启动Web服务"""
         self.logger.debug("开始启动Web服务")
         try:
-            web_config = self.config.get('web_service', {})
-            host = web_config.get('host', '0.0.0.0')
-            port = web_config.get('port', 8000)
+            host = self.settings.web_host
+            port = self.settings.web_port
             
-            self.logger.debug(f"Web服务配置 - Host: {host}, Port: {port}")
+            self.logger.debug("Web服务配置 - Host: %s, Port: %s", host, port)
             
-            # 检查端口是否已被占用
-            import socket
-            self.logger.debug(f"检查端口 {port} 是否可用")
-            try:
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                    s.settimeout(1)
-                    result = s.connect_ex(('127.0.0.1', port))
-                    if result == 0:
-                        self.logger.warning(f"Web服务端口 {port} 已被占用，跳过启动")
-                        self.logger.warning(f"Web服务端口 {port} 已被占用，跳过启动")
-                        return
-                    else:
-                        self.logger.debug(f"端口 {port} 可用")
-            except Exception as e:
-                self.logger.debug(f"端口检查异常: {str(e)}")
+            # Web服务与截图模块在同一进程中，允许其直接硬链接截图目录中的文件
+            allow_link_source(self.screenshot_manager.save_path)
             
             # 在单独线程中启动Web服务
             self.logger.debug("创建Web服务线程")
             self.web_server_thread = threading.Thread(
                 target=self._web_server_wrapper,
-                args=(host, port),
+                args=(host, port, self.settings.web_max_results),
                 daemon=True,
                 name="WebServerThread"
             )
             self.web_server_thread.start()
-            self.logger.debug(f"Web服务线程已启动，线程ID: {self.web_server_thread.ident}")
+            self.logger.debug("Web服务线程已启动，线程ID: %s", self.web_server_thread.ident)
             
-            # 等待一小段时间，检查线程是否正常启动
-            time.sleep(0.5)
-            if self.web_server_thread.is_alive():
-                self.logger.debug("Web服务线程运行正常")
+            # 等待Web服务的启动钩子加载完结果存储后，才改为进程内直接导入结果，
+            # 否则先导入的记录会被加载过程覆盖；线程提前退出（如端口绑定失败）时停止等待
+            while self.web_server_thread.is_alive():
+                if web_server.store_ready.wait(0.1):
+                    self.logger.debug("Web服务线程运行正常")
+                    self._web_in_process = True
+                    break
             else:
                 self.logger.error("Web服务线程启动后立即退出")
             
         except Exception as e:
-            self.logger.error(f"Web服务启动失败: {str(e)}", exc_info=True)
-            self.logger.error(f"Web服务启动失败: {str(e)}")
+            self.logger.error("Web服务启动失败: %s", e, exc_info=True)
             raise
     
-    def _web_server_wrapper(self, host: str, port: int):
+    def _web_server_wrapper(self, host: str, port: int, max_results: int):
         """Web服务器包装函数，用于捕获启动过程中的异常"""
         try:
-            self.logger.debug(f"Web服务器线程开始执行，准备启动服务器 {host}:{port}")
-            start_server(host, port)
+            self.logger.debug("Web服务器线程开始执行，准备启动服务器 %s:%s", host, port)
+            start_server(host, port, max_results)
+        except SystemExit:
+            # uvicorn绑定端口失败时调用sys.exit，而不是抛出普通异常
+            self._web_in_process = False
+            self.logger.warning("Web服务端口 %s 绑定失败（可能已被占用），Web服务未启动", port)
         except Exception as e:
-            self.logger.error(f"Web服务器线程执行失败: {str(e)}", exc_info=True)
-            self.logger.error(f"Web服务器启动异常: {str(e)}")
+            self._web_in_process = False
+            self.logger.error("Web服务器线程执行失败: %s", e, exc_info=True)
             raise
     
+    def _send_screenshot_to_web(self, screenshot_path: str, image_data: bytes,
+                                analysis: Optional[str] = None) -> Optional[str]:
+        """发送截图到Web服务，返回Web服务生成的结果ID"""
+        try:
+            if self._web_in_process:
+                return web_server.ingest_screenshot(os.path.abspath(screenshot_path), image_data, analysis)
+            
+            form = {"timestamp": datetime.now().isoformat()}
+            if analysis:
+                form["analysis"] = analysis
+            # 同机的Web服务可以直接硬链接已保存的截图，只发送路径；
+            # 对方无法访问该文件时（如远程服务）再以原始字节上传图片，无需multipart和base64编码
+            response = self._http.post(
+                self.settings.web_url_screenshot,
+                files={"source_path": (None, os.path.abspath(screenshot_path))},
+                data=form,
+                timeout=5
+            )
+            if response.status_code == 422:
+                response = self._http.post(
+                    self.settings.web_url_screenshot_raw,
+                    params=form,
+                    data=image_data,
+                    headers={"Content-Type": "application/octet-stream"},
+                    timeout=5
+                )
+            if response.status_code == 200:
+                self.logger.info("截图数据已发送到Web服务")
+                return response.json().get('id')
+        except Exception as e:
+            self.logger.error("发送截图到Web服务失败: %s", e)
+        return None
+    
+    def _update_web_analysis(self, result_id: str, analysis: str):
+        """将AI分析结果更新到Web服务中已有的记录"""
+        try:
+            if self._web_in_process:
+                if web_server.update_analysis(result_id, analysis):
+                    self.logger.info("AI分析结果已更新到Web服务")
+                return
+            
+            response = self._http.patch(
+                f"{self.settings.web_url_results}/{result_id}",
+                data=orjson.dumps({"analysis": analysis}),
+                headers=_JSON_HEADERS,
+                timeout=5
+            )
+            if response.status_code == 200:
+                self.logger.info("AI分析结果已更新到Web服务")
+        except Exception as e:
+            self.logger.error("更新Web服务分析结果失败: %s", e)
+    
+    def _send_clipboard_to_web(self, clipboard_content: str, analysis: Optional[str]):
+        """发送剪贴板内容及分析结果到Web服务"""
+        try:
+            if self._web_in_process:
+                web_server.ingest_clipboard(clipboard_content, analysis)
+                return
+            
+            response = self._http.post(
+                self.settings.web_url_clipboard,
+                data=orjson.dumps({
+                    "text": clipboard_content,
+                    "analysis": analysis,
+                    "timestamp": datetime.now().isoformat()
+                }),
+                headers=_JSON_HEADERS,
+                timeout=5
+            )
+            if response.status_code == 200:
+                self.logger.info("剪贴板数据已发送到Web服务")
+        except Exception as e:
+            self.logger.error("发送剪贴板到Web服务失败: %s", e)
+    
+    def _update_web_result(self, web_future, analysis: str):
+        """等待截图推送完成后，把分析结果更新到对应的Web记录"""
+        result_id = web_future.result()
+        if result_id:
+            self._update_web_analysis(result_id, analysis)
+    
+    def _log_analysis(self, analysis: Optional[str]) -> Optional[str]:
+        """记录单次AI分析是否成功，原样返回分析结果"""
+        if analysis:
+            self.logger.info("AI分析完成")
+        else:
+            self.logger.warning("AI分析失败")
+        return analysis
+    
+    def _publish(self, label: str, web_call, email_call):
+        """截图和剪贴板共用的结果分发：邮件在线程池中发送，同时在当前线程执行Web推送，
+        两者都完成后返回（任一项可为None表示未启用）"""
+        email_future = self._executor.submit(email_call) if email_call is not None else None
+        if web_call is not None:
+            web_call()
+        if email_future is not None:
+            if email_future.result():
+                self.logger.info("%s邮件发送成功", label)
+            else:
+                self.logger.error("%s邮件发送失败", label)
+    
     def on_screenshot_trigger(self):
         """截图触发回调函数"""
         self.logger.info("检测到截图触发信号...")
         
-        # 截取屏幕
-        screenshot_path = self.screenshot_manager.take_screenshot()
+        # 截取屏幕，截图字节保留在内存中供Web推送、AI分析和邮件共用
+        result = self.screenshot_manager.take_screenshot_with_data()
         
-        if screenshot_path:
-            # 如果LLM可用，先进行AI分析
+        if result:
+            screenshot_path, image_data = result
+            
+            # 先把截图推送到Web服务（不依赖AI分析结果），与AI分析并行进行
+            web_future = None
+            if self.settings.web_enabled:
+                web_future = self._executor.submit(self._send_screenshot_to_web, screenshot_path, image_data)
+            
+            # 如果LLM可用，进行AI分析
             llm_analysis = None
             if self.llm_manager.is_enabled():
                 self.logger.info("正在进行AI图像分析...")
-                llm_analysis = self.llm_manager.process_image(screenshot_path)
-                if llm_analysis:
-                    self.logger.info("AI分析完成")
-                else:
-                    self.logger.warning("AI分析失败")
+                llm_analysis = self._log_analysis(self.llm_manager.process_image(screenshot_path, image_data))
             
-            # 发送到Web服务（如果启用）
-            if self.config.get('web_service', {}).get('enabled', True):
-                try:
-                    import requests
-                    import base64
-                    from datetime import datetime
-                    
-                    # 读取截图并转换为base64
-                    with open(screenshot_path, 'rb') as f:
-                        image_data = base64.b64encode(f.read()).decode('utf-8')
-                    
-                    # 发送到Web服务
-                    web_config = self.config.get('web_service', {})
-                    host = web_config.get('host', '0.0.0.0')
-                    # 如果host是0.0.0.0，发送请求时使用localhost
-                    request_host = 'localhost' if host == '0.0.0.0' else host
-                    port = web_config.get('port', 8000)
-                    
-                    response = requests.post(
-                        f"http://{request_host}:{port}/api/screenshot",
-                        json={
-                            "image_base64": image_data,
-                            "analysis": llm_analysis,
-                            "timestamp": datetime.now().isoformat()
-                        },
-                        timeout=5
-                    )
-                    if response.status_code == 200:
-                        self.logger.info("截图数据已发送到Web服务")
-                except Exception as e:
-                    self.logger.error(f"发送截图到Web服务失败: {e}")
-            
-            # 发送截图邮件（如果启用）
-            if self.config.get('email', {}).get('enabled', True):
-                success = self.email_sender.send_screenshot_email(screenshot_path)
-                if success:
-                    self.logger.info("截图邮件发送成功")
-                else:
-                    self.logger.error("截图邮件发送失败")
+            # AI分析完成后更新Web服务中的记录，同时发送截图邮件
+            web_call = None
+            if web_future is not None and llm_analysis:
+                web_call = partial(self._update_web_result, web_future, llm_analysis)
+            email_call = None
+            if self.settings.email_enabled:
+                # 主程序已经做过AI分析，分析失败时邮件也不再重复调用LLM
+                email_call = partial(self.email_sender.send_screenshot_email, screenshot_path, llm_analysis, image_data,
+                                     analysis_attempted=True)
+            self._publish("截图", web_call, email_call)
             
-            # 清理旧截图
+            # 清理旧截图（等待邮件发送完成后再清理，避免附件被提前删除）
             self.screenshot_manager.cleanup_old_screenshots()
         else:
             self.logger.error("截图失败")
@@ -341,78 +540,56 @@ class ScreenCaptureApp:
         clipboard_content = self.clipboard_manager.get_clipboard_content()
         
         if clipboard_content:
-            # 如果LLM可用，先进行AI分析
-            llm_analysis = None
-            if self.llm_manager.is_enabled():
-                self.logger.info("正在进行AI文本分析...")
-                llm_analysis = self.llm_manager.process_text(clipboard_content)
-                if llm_analysis:
-                    self.logger.info("AI分析完成")
-                else:
-                    self.logger.warning("AI分析失败")
-            
-            # 发送到Web服务（如果启用）
-            if self.config.get('web_service', {}).get('enabled', True):
-                try:
-                    import requests
-                    from datetime import datetime
-                    
-                    # 发送到Web服务
-                    web_config = self.config.get('web_service', {})
-                    host = web_config.get('host', '0.0.0.0')
-                    # 如果host是0.0.0.0，发送请求时使用localhost
-                    request_host = 'localhost' if host == '0.0.0.0' else host
-                    port = web_config.get('port', 8000)
-                    
-                    response = requests.post(
-                        f"http://{request_host}:{port}/api/clipboard",
-                        json={
-                            "text": clipboard_content,
-                            "analysis": llm_analysis,
-                            "timestamp": datetime.now().isoformat()
-                        },
-                        timeout=5
-                    )
-                    if response.status_code == 200:
-                        self.logger.info("剪贴板数据已发送到Web服务")
-                except Exception as e:
-                    self.logger.error(f"发送剪贴板到Web服务失败: {e}")
+            # 配置了batch_window时，窗口内的连续触发先缓存，窗口结束后合并为一次批量分析；
+            # 默认为0，每次触发立即分析
+            window = self.settings.batch_window
+            if window <= 0 or not self.llm_manager.is_enabled():
+                self._process_clipboard_batch([clipboard_content])
+                return
             
-            # 发送剪贴板邮件（如果启用）
-            if self.config.get('email', {}).get('enabled', True):
-                success = self.email_sender.send_clipboard_email(clipboard_content)
-                if success:
-                    self.logger.info("剪贴板邮件发送成功")
-                else:
-                    self.logger.error("剪贴板邮件发送失败")
+            with self._clipboard_lock:
+                self._clipboard_pending.append(clipboard_content)
+                # 窗口从批次中第一条内容开始计时，后续触发不再重置，连续触发也不会无限推迟分析
+                if self._clipboard_timer is None:
+                    self._clipboard_timer = threading.Timer(window, self._flush_clipboard_batch)
+                    self._clipboard_timer.daemon = True
+                    self._clipboard_timer.start()
+            self.logger.debug("剪贴板内容已加入批处理队列，将在%s秒窗口结束后统一分析", window)
         else:
             self.logger.warning("剪贴板内容为空")
     
+    def _flush_clipboard_batch(self):
+        """取出缓存的剪贴板内容并批量处理"""
+        with self._clipboard_lock:
+            texts = self._clipboard_pending
+            self._clipboard_pending = []
+            self._clipboard_timer = None
+        
+        if texts:
+            self._process_clipboard_batch(texts)
+    
+    def _process_clipboard_batch(self, texts):
+        """批量分析剪贴板内容，并逐条推送到Web服务和邮件"""
+        # 如果LLM可用，先进行AI分析
+        analyses = [None] * len(texts)
+        if self.llm_manager.is_enabled():
+            self.logger.info("正在进行AI文本分析（共 %s 条）...", len(texts))
+            analyses = [self._log_analysis(a) for a in self.llm_manager.process_text_batch(texts)]
+        
+        for clipboard_content, llm_analysis in zip(texts, analyses):
+            web_call = None
+            if self.settings.web_enabled:
+                web_call = partial(self._send_clipboard_to_web, clipboard_content, llm_analysis)
+            email_call = None
+            if self.settings.email_enabled:
+                email_call = partial(self.email_sender.send_clipboard_email, clipboard_content, llm_analysis,
+                                     analysis_attempted=True)
+            self._publish("剪贴板", web_call, email_call)
+    
     def start(self):
         """启动应用程序"""
         # 显示大型ASCII艺术logo
-        logo = """
-╔══════════════════════════════════════════════════════════════════════════════╗
-║                                                                              ║
-║     █████╗  █████╗  █████╗ ██╗                                             ║
-║    ██╔══██╗██╔══██╗██╔══██╗██║                                             ║
-║    ███████║███████║███████║██║                                             ║
-║    ██╔══██║██╔══██║██╔══██║██║                                             ║
-║    ██║  ██║██║  ██║██║  ██║██║                                             ║
-║    ╚═╝  ╚═╝╚═╝  ╚═╝╚═╝  ╚═╝╚═╝                                             ║
-║                                                                              ║
-║           Another AI Assistant for Interview (AAAI)                         ║
-║                     智能面试助手 - 屏幕截图与分析工具                          ║
-║                                                                              ║
-║    🎯 功能特性:                                                               ║
-║       • 智能截图分析 - AI驱动的图像理解                                        ║
-║       • 剪贴板监控 - 自动文本分析与处理                                        ║
-║       • Web界面管理 - 实时查看分析结果                                         ║
-║       • 邮件通知 - 自动发送分析报告                                           ║
-║                                                                              ║
-╚══════════════════════════════════════════════════════════════════════════════╝
-"""
-        self.logger.info(logo)
+        self.logger.info("%s", LOGO)
         
         # 加载配置
         if not self.load_config():
@@ -423,7 +600,7 @@ class ScreenCaptureApp:
             return False
         
         # 发送测试邮件（如果启用）
-        if self.config.get('email', {}).get('enabled', True):
+        if self.settings.email_enabled:
             self.logger.info("\n📧 正在发送测试邮件...")
             if self.email_sender.send_test_email():
                 self.logger.info("✅ 测试邮件发送成功，邮件配置正常")
@@ -440,30 +617,15 @@ class ScreenCaptureApp:
         self.running = True
         
         # 显示操作说明
-        operation_guide = """
-╔══════════════════════════════════════════════════════════════════════════════╗
-║                              🚀 系统已就绪                                   ║
-╠══════════════════════════════════════════════════════════════════════════════╣
-║                                                                              ║
-║  📖 操作指南:                                                                 ║
-║                                                                              ║
-║     ⌨️  截图功能:    连续按 3 次 Enter 键                                     ║
-║     📋 剪贴板功能:   连续按 3 次 Shift 键                                     ║
-║     🌐 Web界面:     http://localhost:8000                                   ║
-║     📧 邮件通知:     自动发送分析结果                                          ║
-║                                                                              ║
-║  💡 提示: 按 Ctrl+C 可安全退出程序                                            ║
-║                                                                              ║
-║  🔄 程序正在后台运行，等待您的操作...                                          ║
-║                                                                              ║
-╚══════════════════════════════════════════════════════════════════════════════╝
-"""
-        self.logger.info(operation_guide)
+        self.logger.info("%s", OPERATION_GUIDE)
         
         try:
-            # 主循环
+            # 主循环：阻塞等待唤醒事件，超时后也会兜底检查一次监听器状态
             while self.running:
-                time.sleep(1)
+                self._wake_event.wait(timeout=5.0)
+                self._wake_event.clear()
+                if not self.running:
+                    break
                 
                 # 检查监听器状态
                 if not self.keyboard_listener.is_running():
@@ -473,7 +635,7 @@ class ScreenCaptureApp:
         except KeyboardInterrupt:
             self.logger.info("\n接收到退出信号...")
         except Exception as e:
-            self.logger.error(f"\n程序运行出错: {str(e)}")
+            self.logger.error("\n程序运行出错: %s", e)
         finally:
             self.stop()
         
@@ -483,15 +645,34 @@ class ScreenCaptureApp:
         """停止应用程序"""
         self.logger.info("正在停止程序...")
         self.running = False
+        self._wake_event.set()
         
         if self.keyboard_listener:
             self.keyboard_listener.stop_listening()
         
+        # 退出时不再为尚未到期的剪贴板批次发起LLM请求，丢弃并提示
+        with self._clipboard_lock:
+            if self._clipboard_timer is not None:
+                self._clipboard_timer.cancel()
+                self._clipboard_timer = None
+            dropped = len(self._clipboard_pending)
+            self._clipboard_pending = []
+        if dropped:
+            self.logger.warning("程序退出，丢弃 %s 条尚未分析的剪贴板内容", dropped)
+        
+        self._executor.shutdown(wait=False)
+        
+        if self.email_sender:
+            self.email_sender.close()
+        
+        if self.llm_manager:
+            self.llm_manager.close()
+        
         self.logger.info("程序已停止")
     
     def signal_handler(self, signum, frame):
         """信号处理器"""
-        self.logger.info(f"\n接收到信号 {signum}，正在退出...")
+        self.logger.info("\n接收到信号 %s，正在退出...", signum)
         self.stop()
         sys.exit(0)
 
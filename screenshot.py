@@ -1,14 +1,31 @@
+import io
 import os
 import time
+import logging
 from datetime import datetime
 from PIL import ImageGrab
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger('ScreenshotManager')
 
 class ScreenshotManager:
     def __init__(self, config: Dict):
         self.config = config
         self.save_path = config['screenshot']['save_path']
         self.image_format = config['screenshot']['image_format']
+        # 截图文件扩展名（小写），生成和筛选截图文件名时使用
+        self._suffix = f'.{self.image_format.lower()}'
+        
+        # 编码参数：截图保存后马上被上传和分析，PNG默认的压缩级别6在4K屏幕上要花费
+        # 数百毫秒，默认改用压缩级别1；JPEG/WebP使用quality控制质量
+        screenshot_config = config['screenshot']
+        fmt = self.image_format.upper()
+        if fmt == 'PNG':
+            self._save_options = {'compress_level': screenshot_config.get('compress_level', 1)}
+        elif fmt in ('JPEG', 'JPG', 'WEBP'):
+            self._save_options = {'quality': screenshot_config.get('quality', 85)}
+        else:
+            self._save_options = {}
         
         # 确保截图保存目录存在
         self._ensure_directory_exists()
@@ -17,15 +34,19 @@ class ScreenshotManager:
         """确保截图保存目录存在"""
         if not os.path.exists(self.save_path):
             os.makedirs(self.save_path)
-            print(f"创建截图保存目录: {self.save_path}")
+            logger.info("创建截图保存目录: %s", self.save_path)
     
     def _generate_filename(self) -> str:
         """生成截图文件名"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return f"screenshot_{timestamp}.{self.image_format.lower()}"
+        return f"screenshot_{datetime.now():%Y%m%d_%H%M%S}{self._suffix}"
     
     def take_screenshot(self) -> Optional[str]:
         """截取全屏并保存"""
+        result = self.take_screenshot_with_data()
+        return result[0] if result else None
+    
+    def take_screenshot_with_data(self) -> Optional[Tuple[str, bytes]]:
+        """截取全屏并保存，同时返回编码后的图片字节，调用方无需再从磁盘读取"""
         try:
             # 截取全屏
             screenshot = ImageGrab.grab()
@@ -34,16 +55,32 @@ class ScreenshotManager:
             filename = self._generate_filename()
             filepath = os.path.join(self.save_path, filename)
             
-            # 保存截图
-            screenshot.save(filepath, self.image_format)
+            # 先编码到内存，再写入文件
+            buffer = io.BytesIO()
+            screenshot.save(buffer, self.image_format, **self._save_options)
+            data = buffer.getvalue()
+            with open(filepath, 'wb') as f:
+                f.write(data)
             
-            print(f"截图已保存: {filepath}")
-            return filepath
+            logger.info("截图已保存: %s", filepath)
+            return filepath, data
             
         except Exception as e:
-            print(f"截图失败: {str(e)}")
+            logger.error("截图失败: %s", e)
             return None
     
+    def _list_screenshots(self) -> List[os.DirEntry]:
+        """列出所有截图文件，按时间从新到旧排序
+        
+        文件名中的时间戳为 YYYYMMDD_HHMMSS，字典序即时间顺序，直接按文件名排序，
+        不需要对每个文件调用stat获取修改时间。
+        """
+        with os.scandir(self.save_path) as it:
+            entries = [e for e in it
+                       if e.name.startswith('screenshot_') and e.name.lower().endswith(self._suffix)]
+        entries.sort(key=lambda e: e.name, reverse=True)
+        return entries
+    
     def get_latest_screenshot(self) -> Optional[str]:
         """获取最新的截图文件路径"""
         try:
@@ -51,20 +88,15 @@ class ScreenshotManager:
                 return None
             
             # 获取所有截图文件
-            files = [f for f in os.listdir(self.save_path) 
-                    if f.startswith('screenshot_') and f.lower().endswith(f'.{self.image_format.lower()}')]
+            entries = self._list_screenshots()
             
-            if not files:
+            if not entries:
                 return None
             
-            # 按修改时间排序，获取最新的
-            files.sort(key=lambda x: os.path.getmtime(os.path.join(self.save_path, x)), reverse=True)
-            latest_file = files[0]
-            
-            return os.path.join(self.save_path, latest_file)
+            return entries[0].path
             
         except Exception as e:
-            print(f"获取最新截图失败: {str(e)}")
+            logger.error("获取最新截图失败: %s", e)
             return None
     
     def cleanup_old_screenshots(self, keep_count: int = 10):
@@ -73,22 +105,16 @@ class ScreenshotManager:
             if not os.path.exists(self.save_path):
                 return
             
-            # 获取所有截图文件
-            files = [f for f in os.listdir(self.save_path) 
-                    if f.startswith('screenshot_') and f.lower().endswith(f'.{self.image_format.lower()}')]
+            # 获取所有截图文件（从新到旧）
+            entries = self._list_screenshots()
             
-            if len(files) <= keep_count:
+            if len(entries) <= keep_count:
                 return
             
-            # 按修改时间排序
-            files.sort(key=lambda x: os.path.getmtime(os.path.join(self.save_path, x)), reverse=True)
-            
             # 删除多余的文件
-            files_to_delete = files[keep_count:]
-            for file in files_to_delete:
-                filepath = os.path.join(self.save_path, file)
-                os.remove(filepath)
-                print(f"删除旧截图: {filepath}")
+            for entry in entries[keep_count:]:
+                os.unlink(entry.path)
+                logger.info("删除旧截图: %s", entry.path)
                 
         except Exception as e:
-            print(f"清理截图失败: {str(e)}")
\ No newline at end of file
+            logger.error("清理截图失败: %s", e)
\ No newline at end of file
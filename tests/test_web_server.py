@@ -0,0 +1,77 @@
+import asyncio
+import base64
+import binascii
+import importlib
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("orjson")
+
+
+class _ChunkedRequest:
+    """只提供stream()的假请求，按给定大小把请求体切块返回"""
+
+    def __init__(self, body: bytes, chunk_size: int):
+        self._body = body
+        self._chunk_size = chunk_size
+
+    async def stream(self):
+        for i in range(0, len(self._body), self._chunk_size):
+            yield self._body[i:i + self._chunk_size]
+
+
+@pytest.fixture
+def web_server(tmp_path, monkeypatch):
+    # web_server导入时会在当前目录下创建web_data
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("web_server")
+
+
+def _stream(web_server, path, body: bytes, chunk_size: int) -> int:
+    request = _ChunkedRequest(body, chunk_size)
+    return asyncio.run(web_server._stream_body_to_file(request, path, True))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 5, 7, 64])
+def test_base64_body_split_across_chunks(web_server, tmp_path, chunk_size):
+    image = bytes(range(256)) * 3 + b"\x89PNG"
+    # 带换行的base64文本，块边界会落在编码单元和换行符的中间
+    body = base64.encodebytes(image)
+    path = tmp_path / "out.png"
+
+    written = _stream(web_server, path, body, chunk_size)
+
+    assert written == len(image)
+    assert path.read_bytes() == image
+
+
+@pytest.mark.parametrize("body", [b"iVBO*w0K", b"iVA=iVBO", b"iVBOw0"])
+def test_invalid_base64_body_rejected(web_server, tmp_path, body):
+    with pytest.raises(binascii.Error):
+        _stream(web_server, tmp_path / "out.png", body, 3)
+
+
+def test_startup_keeps_results_ingested_before_load(web_server):
+    result_id = web_server.ingest_clipboard("启动钩子执行前导入的内容")
+
+    web_server.load_results_store()
+
+    assert result_id in web_server._results
+    assert web_server.store_ready.is_set()
+    web_server.flush_pending_lines()
+    assert result_id in web_server.RESULTS_FILE.read_text(encoding="utf-8")
+
+
+def test_source_path_with_non_file_image_field_rejected(web_server):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    client = TestClient(web_server.app)
+    # source_path不在允许硬链接的目录中，image又只是普通文本字段，应返回422而不是500
+    response = client.post("/api/screenshot", files={
+        "source_path": (None, "/nonexistent/screenshot.png"),
+        "image": (None, "not-a-file"),
+    })
+
+    assert response.status_code == 422
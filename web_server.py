@@ -1,14 +1,21 @@
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel
-import json
+from fastapi.responses import FileResponse, HTMLResponse, ORJSONResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+import atexit
+import orjson
 import os
+import shutil
 import sys
-import base64
+import binascii
+import functools
+import threading
+import time
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 import uvicorn
 from pathlib import Path
 import logging
@@ -17,37 +24,34 @@ import logging
 web_logger = logging.getLogger('WebServer')
 web_logger.setLevel(logging.WARNING)  # 只显示WARNING及以上级别
 
+# 资源基础路径：PyInstaller打包后为临时解压目录，开发环境为本文件所在目录
+_BASE_PATH = getattr(sys, '_MEIPASS', None) or os.path.dirname(os.path.abspath(__file__))
+
+@functools.lru_cache(maxsize=None)
 def get_resource_path(relative_path: str) -> str:
-    """获取资源文件的绝对路径，兼容开发环境和PyInstaller打包环境"""
-    web_logger.debug(f"解析资源路径: {relative_path}")
-    try:
-        # PyInstaller打包后的临时目录
-        base_path = sys._MEIPASS
-        web_logger.debug(f"检测到PyInstaller环境，基础路径: {base_path}")
-    except AttributeError:
-        # 开发环境
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        web_logger.debug(f"开发环境，基础路径: {base_path}")
-    
-    full_path = os.path.join(base_path, relative_path)
-    web_logger.debug(f"完整资源路径: {full_path}")
-    
-    # 检查路径是否存在
-    if os.path.exists(full_path):
-        web_logger.debug(f"资源路径存在: {full_path}")
-    else:
-        web_logger.warning(f"资源路径不存在: {full_path}")
+    """获取资源文件的绝对路径，兼容开发环境和PyInstaller打包环境
     
+    不检查路径是否存在：目录缺失时StaticFiles/Jinja2Templates会自行报错。
+    """
+    full_path = os.path.join(_BASE_PATH, relative_path)
+    web_logger.debug("资源路径: %s -> %s", relative_path, full_path)
     return full_path
 
 web_logger.info("初始化FastAPI应用")
-app = FastAPI(title="ExamAssistant Web Display", version="1.0.0")
+# 结果列表中包含较长的分析文本，统一使用orjson序列化响应
+app = FastAPI(title="ExamAssistant Web Display", version="1.0.0", default_response_class=ORJSONResponse)
 web_logger.debug("FastAPI应用创建成功")
 
 # 数据存储路径
 web_logger.info("设置数据存储路径")
 DATA_DIR = Path("web_data")
-RESULTS_FILE = DATA_DIR / "results.json"
+# 结果以JSONL追加写入：每行一条完整记录，同ID的后出现行覆盖之前的记录，
+# 删除写入墓碑行；过期行超过阈值时整体压缩重写
+RESULTS_FILE = DATA_DIR / "results.jsonl"
+LEGACY_RESULTS_FILE = DATA_DIR / "results.json"
+COMPACT_THRESHOLD = 1000
+# 内存和文件中最多保留的结果条数，超出时淘汰最早的结果（由start_server按配置设置）
+DEFAULT_MAX_RESULTS = 100
 IMAGES_DIR = DATA_DIR / "images"
 web_logger.debug(f"数据目录: {DATA_DIR}, 结果文件: {RESULTS_FILE}, 图片目录: {IMAGES_DIR}")
 
@@ -62,6 +66,50 @@ except Exception as e:
     web_logger.error(f"创建目录失败: {str(e)}", exc_info=True)
     raise
 
+# 允许以硬链接方式导入截图的本地目录（由同进程的截图模块注册），避免再写一份图片
+_link_source_dirs: List[Path] = []
+
+def allow_link_source(directory: str):
+    """注册允许通过source_path硬链接导入截图的本地目录"""
+    _link_source_dirs.append(Path(directory).resolve())
+    web_logger.debug("允许硬链接导入的目录: %s", directory)
+
+def _link_source_image(source_path: str, image_path: Path) -> bool:
+    """将已注册目录中的本地截图硬链接到图片目录，失败（跨分区、路径不允许等）时返回False"""
+    try:
+        source = Path(source_path).resolve()
+        if not any(source.is_relative_to(d) for d in _link_source_dirs):
+            web_logger.warning("拒绝硬链接未注册目录中的文件: %s", source_path)
+            return False
+        os.link(source, image_path)
+        return True
+    except (OSError, ValueError) as e:
+        web_logger.debug("硬链接截图失败: %s", e)
+        return False
+
+class _ZeroCopyFileResponse(FileResponse):
+    """服务器支持ASGI zerocopysend扩展时，把文件交给内核通过sendfile发送，不再分块读入Python"""
+    
+    async def __call__(self, scope, receive, send):
+        headers = scope.get("headers", ())
+        if scope.get("method") == "HEAD" or any(name == b"range" for name, _ in headers):
+            # HEAD和Range请求仍由FileResponse处理
+            await super().__call__(scope, receive, send)
+            return
+        
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        with open(self.path, 'rb') as f:
+            await send({"type": "http.response.zerocopysend", "file": f, "more_body": False})
+
+class _ZeroCopyStaticFiles(StaticFiles):
+    """在支持zerocopysend扩展的服务器上以零拷贝方式返回文件，否则与StaticFiles完全一致"""
+    
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if isinstance(response, FileResponse) and "http.response.zerocopysend" in scope.get("extensions", {}):
+            return _ZeroCopyFileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        return response
+
 # 静态文件和模板 - 使用动态路径解析
 web_logger.info("配置静态文件和模板目录")
 static_dir = get_resource_path("static")
@@ -77,7 +125,8 @@ try:
     app.mount("/static", StaticFiles(directory=static_dir), name="static")
     web_logger.debug("静态文件目录挂载成功")
     
-    app.mount("/web_data", StaticFiles(directory=web_data_dir), name="web_data")
+    # 截图图片体积较大，使用支持零拷贝发送的静态文件应用
+    app.mount("/web_data", _ZeroCopyStaticFiles(directory=web_data_dir), name="web_data")
     web_logger.debug("Web数据目录挂载成功")
     
     web_logger.info("初始化模板引擎")
@@ -91,235 +140,601 @@ class AnalysisResult(BaseModel):
     type: str  # "screenshot" or "clipboard"
     content: Optional[str] = None  # 剪贴板文本内容
     image_path: Optional[str] = None  # 截图文件路径
-    analysis: str  # LLM分析结果
+    analysis: Optional[str] = None  # LLM分析结果
     timestamp: str
     id: str
 
 class ScreenshotData(BaseModel):
     image_base64: str
-    analysis: str
+    analysis: Optional[str] = None  # 可先不带分析结果提交，之后通过PATCH补充
     timestamp: Optional[str] = None
 
 class ClipboardData(BaseModel):
     text: str
-    analysis: str
+    analysis: Optional[str] = None
     timestamp: Optional[str] = None
 
+class AnalysisUpdate(BaseModel):
+    analysis: str
+
+async def _parse_body(request: Request, model):
+    """用pydantic-core直接从原始请求体解析并校验JSON，校验失败时返回与类型化参数一致的422响应"""
+    try:
+        return model.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+def _read_results_log() -> tuple:
+    """读取JSONL结果日志，返回(按插入顺序的结果列表, 过期行数)"""
+    records = {}
+    stale = 0
+    with open(RESULTS_FILE, 'rb') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                # 跳过写入中断留下的不完整行，不影响其余记录
+                web_logger.warning("结果文件第 %s 行格式错误，已跳过: %s", line_no, e)
+                stale += 1
+                continue
+            
+            record_id = record.get("id")
+            if record.get("_deleted"):
+                # 墓碑行和被删除的记录行都是过期行
+                stale += 1 if records.pop(record_id, None) is None else 2
+            else:
+                if record_id in records:
+                    stale += 1
+                records[record_id] = record
+    
+    return list(records.values()), stale
+
+def _migrate_legacy_results():
+    """将旧版results.json转换为JSONL格式"""
+    web_logger.info("检测到旧版结果文件，转换为JSONL格式: %s", LEGACY_RESULTS_FILE)
+    try:
+        with open(LEGACY_RESULTS_FILE, 'rb') as f:
+            results = orjson.loads(f.read())
+        save_results(results)
+        LEGACY_RESULTS_FILE.rename(LEGACY_RESULTS_FILE.with_suffix('.json.bak'))
+    except Exception as e:
+        web_logger.error("转换旧版结果文件失败: %s", e, exc_info=True)
+
 def load_results() -> List[dict]:
     """加载存储的分析结果"""
-    web_logger.info(f"尝试加载结果文件: {RESULTS_FILE}")
+    web_logger.debug("尝试加载结果文件: %s", RESULTS_FILE)
+    if not RESULTS_FILE.exists() and LEGACY_RESULTS_FILE.exists():
+        _migrate_legacy_results()
+    
     if RESULTS_FILE.exists():
         try:
-            with open(RESULTS_FILE, 'r', encoding='utf-8') as f:
-                results = json.load(f)
-            web_logger.info(f"成功加载 {len(results)} 条结果")
+            results, stale = _read_results_log()
+            web_logger.debug("成功加载 %s 条结果", len(results))
+            if stale >= COMPACT_THRESHOLD:
+                web_logger.info("结果文件中有 %s 行过期记录，进行压缩", stale)
+                save_results(results)
             return results
-        except json.JSONDecodeError as e:
-            web_logger.error(f"结果文件JSON格式错误: {str(e)}", exc_info=True)
-            return []
         except Exception as e:
-            web_logger.error(f"加载结果文件失败: {str(e)}", exc_info=True)
+            web_logger.error("加载结果文件失败: %s", e, exc_info=True)
             return []
     else:
-        web_logger.info("结果文件不存在，返回空列表")
+        web_logger.debug("结果文件不存在，返回空列表")
         return []
 
+# 待写入结果日志的行：请求只把行放入缓冲区立即返回，由后台线程每隔FLUSH_INTERVAL秒合并写入一次，
+# 请求延迟不再受磁盘写入影响；进程退出时再写入一次，避免丢失
+FLUSH_INTERVAL = 0.5
+_pending_lines: List[bytes] = []
+_pending_lock = threading.Lock()
+_flusher_started = False
+
+def flush_pending_lines():
+    """把缓冲区中的行写入结果日志，写入失败时保留在缓冲区中等待下次重试"""
+    with _pending_lock:
+        if not _pending_lines:
+            return
+        try:
+            RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(RESULTS_FILE, 'ab') as f:
+                f.write(b''.join(line + b'\n' for line in _pending_lines))
+            _pending_lines.clear()
+        except Exception as e:
+            web_logger.error("写入结果日志失败，稍后重试: %s", e, exc_info=True)
+
+def _flush_loop():
+    """后台定期写入缓冲区"""
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush_pending_lines()
+
+def _append_lines(lines: List[bytes]):
+    """向结果日志追加若干行（已编码的UTF-8 JSON），实际写入由后台线程完成"""
+    global _flusher_started
+    with _pending_lock:
+        _pending_lines.extend(lines)
+        if not _flusher_started:
+            _flusher_started = True
+            threading.Thread(target=_flush_loop, daemon=True, name="ResultsFlusher").start()
+            atexit.register(flush_pending_lines)
+
+def append_result(result: dict):
+    """追加（或覆盖同ID的）一条分析结果"""
+    web_logger.debug("追加结果到文件: %s", RESULTS_FILE)
+    try:
+        _append_lines([orjson.dumps(result)])
+    except Exception as e:
+        web_logger.error("追加结果失败: %s", e, exc_info=True)
+        raise
+
+def append_tombstone(result_id: str):
+    """追加一条删除标记"""
+    web_logger.debug("追加删除标记到文件: %s，ID: %s", RESULTS_FILE, result_id)
+    try:
+        _append_lines([orjson.dumps({"id": result_id, "_deleted": True})])
+    except Exception as e:
+        web_logger.error("追加删除标记失败: %s", e, exc_info=True)
+        raise
+
 def save_results(results: List[dict]):
-    """保存分析结果到文件"""
-    web_logger.info(f"尝试保存 {len(results)} 条结果到文件: {RESULTS_FILE}")
+    """整体重写结果文件（压缩过期行），先写临时文件再替换，避免中途失败损坏数据"""
+    web_logger.debug("尝试保存 %s 条结果到文件: %s", len(results), RESULTS_FILE)
     try:
         # 确保目录存在
         RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
-        web_logger.info(f"成功保存结果文件: {RESULTS_FILE}")
+        # 整体重写已包含缓冲区中尚未写入的变更，持有缓冲区锁重写并清空缓冲区，
+        # 避免后台线程把旧的行追加到新文件中
+        tmp_file = RESULTS_FILE.with_suffix('.jsonl.tmp')
+        with _pending_lock:
+            with open(tmp_file, 'wb') as f:
+                f.write(b''.join(orjson.dumps(result) + b'\n' for result in results))
+            os.replace(tmp_file, RESULTS_FILE)
+            _pending_lines.clear()
+        web_logger.debug("成功保存结果文件: %s", RESULTS_FILE)
     except PermissionError as e:
-        web_logger.error(f"保存结果文件权限不足: {str(e)}", exc_info=True)
+        web_logger.error("保存结果文件权限不足: %s", e, exc_info=True)
         raise
-    except json.JSONEncodeError as e:
-        web_logger.error(f"结果数据JSON序列化失败: {str(e)}", exc_info=True)
+    except (TypeError, ValueError) as e:
+        web_logger.error("结果数据JSON序列化失败: %s", e, exc_info=True)
         raise
     except Exception as e:
-        web_logger.error(f"保存结果文件失败: {str(e)}", exc_info=True)
+        web_logger.error("保存结果文件失败: %s", e, exc_info=True)
         raise
 
+# 内存中的结果（按插入顺序，ID -> 记录），服务启动时从文件加载一次，
+# 之后读请求直接访问内存，写请求同时追加到文件
+_results: Dict[str, dict] = {}
+_results_lock = threading.Lock()
+# 启动以来追加的过期行数（被覆盖的记录和删除标记），用于触发压缩
+_stale_lines = 0
+_max_results = DEFAULT_MAX_RESULTS
+
+def _remove_image(result: dict):
+    """删除结果对应的图片文件"""
+    if result.get("image_path"):
+        try:
+            (DATA_DIR / result["image_path"]).unlink(missing_ok=True)
+        except OSError as e:
+            web_logger.warning("删除图片失败: %s", e)
+
+# 结果存储加载完成（启动钩子执行完毕）后置位，同进程的主程序据此开始直接导入结果
+store_ready = threading.Event()
+
+@app.on_event("startup")
+def load_results_store():
+    """启动时加载结果文件到内存，超出上限的旧结果直接淘汰并压缩文件
+    
+    启动前已导入内存的结果（缓冲区中可能尚未写入文件）不会丢失：先写入缓冲区再读取文件，
+    并以内存中的记录为准合并。
+    """
+    global _stale_lines
+    with _results_lock:
+        flush_pending_lines()
+        merged = {result["id"]: result for result in load_results()}
+        merged.update(_results)
+        results = list(merged.values())
+        evicted = results[:-_max_results] if len(results) > _max_results else []
+        _results.clear()
+        for result in results[len(evicted):]:
+            _results[result["id"]] = result
+        _stale_lines = 0
+        if evicted:
+            web_logger.info("结果数超过上限 %s，淘汰 %s 条旧结果", _max_results, len(evicted))
+            save_results(list(_results.values()))
+    for result in evicted:
+        _remove_image(result)
+    store_ready.set()
+
+def _evict_overflow() -> List[dict]:
+    """淘汰超出上限的最早结果并追加删除标记，返回被淘汰的记录（调用方需持有_results_lock）"""
+    evicted = []
+    while len(_results) > _max_results:
+        evicted.append(_results.pop(next(iter(_results))))
+    if evicted:
+        _append_lines([orjson.dumps({"id": result["id"], "_deleted": True}) for result in evicted])
+        # 墓碑行和被淘汰的记录行都是过期行
+        _mark_stale(2 * len(evicted))
+    return evicted
+
+def _mark_stale(count: int):
+    """记录过期行数，达到阈值时用内存中的结果压缩文件（调用方需持有_results_lock）"""
+    global _stale_lines
+    _stale_lines += count
+    if _stale_lines >= COMPACT_THRESHOLD:
+        web_logger.info("结果文件中有 %s 行过期记录，进行压缩", _stale_lines)
+        save_results(list(_results.values()))
+        _stale_lines = 0
+
+def add_result(result: dict):
+    """保存一条新的分析结果，超出上限时淘汰最早的结果及其图片"""
+    with _results_lock:
+        append_result(result)
+        _results[result["id"]] = result
+        evicted = _evict_overflow()
+    for old in evicted:
+        _remove_image(old)
+
+def get_all_results() -> List[dict]:
+    """获取所有分析结果的快照"""
+    with _results_lock:
+        return list(_results.values())
+
+_last_id_ns = 0
+
 def generate_id() -> str:
-    """生成唯一ID"""
-    return datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    """生成唯一ID（纳秒时间戳，保证严格递增，避免时钟精度不足时重复）"""
+    global _last_id_ns
+    _last_id_ns = max(time.time_ns(), _last_id_ns + 1)
+    return str(_last_id_ns)
+
+def _write_image(image_path: Path, source):
+    """将图片写入文件，source为bytes或可读的文件对象"""
+    with open(image_path, 'wb') as f:
+        if isinstance(source, bytes):
+            f.write(source)
+        else:
+            shutil.copyfileobj(source, f, 1024 * 1024)
+
+def _screenshot_record(result_id: str, image_filename: str, analysis: Optional[str],
+                       timestamp: Optional[str]) -> dict:
+    """构造截图结果记录"""
+    return {
+        "id": result_id,
+        "type": "screenshot",
+        "content": None,
+        "image_path": f"images/{image_filename}",
+        "analysis": analysis,
+        "timestamp": timestamp or datetime.now().isoformat()
+    }
+
+def _clipboard_record(result_id: str, text: str, analysis: Optional[str],
+                      timestamp: Optional[str]) -> dict:
+    """构造剪贴板结果记录"""
+    return {
+        "id": result_id,
+        "timestamp": timestamp or datetime.now().isoformat(),
+        "type": "clipboard",
+        "content": text,
+        "analysis": analysis,
+        "image_path": None
+    }
+
+# 以下ingest_*/update_analysis供同进程的主程序直接调用，与对应的HTTP接口共用同一份存储，
+# 省去本机HTTP往返、请求解析和响应序列化
+
+def ingest_screenshot(source_path: str, image_data: bytes, analysis: Optional[str] = None,
+                      timestamp: Optional[str] = None) -> str:
+    """直接导入一张截图（优先硬链接本地文件，失败时写入image_data），返回结果ID"""
+    result_id = generate_id()
+    image_filename = f"screenshot_{result_id}.png"
+    image_path = IMAGES_DIR / image_filename
+    if not _link_source_image(source_path, image_path):
+        _write_image(image_path, image_data)
+    add_result(_screenshot_record(result_id, image_filename, analysis, timestamp))
+    web_logger.debug("截图数据已导入，ID: %s", result_id)
+    return result_id
+
+def ingest_clipboard(text: str, analysis: Optional[str] = None, timestamp: Optional[str] = None) -> str:
+    """直接导入一条剪贴板内容，返回结果ID"""
+    result_id = generate_id()
+    add_result(_clipboard_record(result_id, text, analysis, timestamp))
+    web_logger.debug("剪贴板数据已导入，ID: %s", result_id)
+    return result_id
+
+def update_analysis(result_id: str, analysis: str) -> bool:
+    """更新指定结果的分析内容，结果不存在时返回False"""
+    with _results_lock:
+        result = _results.get(result_id)
+        if result is None:
+            return False
+        updated = {**result, "analysis": analysis}
+        append_result(updated)
+        _results[result_id] = updated
+        _mark_stale(1)
+    return True
+
+# 主页是静态页面，结果由前端通过/api/results加载，只需渲染一次
+_page_cache: Optional[str] = None
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     """主页 - 显示所有分析结果"""
-    web_logger.info("收到主页访问请求")
+    global _page_cache
+    web_logger.debug("收到主页访问请求")
     try:
-        results = load_results()
-        web_logger.info(f"加载了 {len(results)} 条分析结果")
-        return templates.TemplateResponse("index.html", {"request": request, "results": results})
+        if _page_cache is None:
+            web_logger.debug("渲染主页")
+            _page_cache = templates.get_template("index.html").render(request=request)
+        return HTMLResponse(content=_page_cache)
     except Exception as e:
-        web_logger.error(f"主页加载失败: {str(e)}", exc_info=True)
+        web_logger.error("主页加载失败: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"主页加载失败: {str(e)}")
 
 @app.get("/api/results")
-async def get_results():
-    """获取所有分析结果"""
-    web_logger.info("收到获取所有结果请求")
+async def get_results(limit: Optional[int] = None, before_id: Optional[str] = None):
+    """获取分析结果（按时间顺序）
+    
+    可选分页参数：before_id只返回该ID之前的结果，limit只返回其中最新的limit条。
+    """
+    web_logger.debug("收到获取所有结果请求")
     try:
-        results = load_results()
-        web_logger.info(f"返回 {len(results)} 条结果")
-        return JSONResponse(content={"results": results})
+        results = get_all_results()
+        if before_id is not None:
+            ids = [result["id"] for result in results]
+            results = results[:ids.index(before_id)] if before_id in ids else []
+        if limit is not None:
+            results = results[-limit:] if limit > 0 else []
+        web_logger.debug("返回 %s 条结果", len(results))
+        return ORJSONResponse(content={"results": results})
     except Exception as e:
-        web_logger.error(f"获取结果失败: {str(e)}", exc_info=True)
+        web_logger.error("获取结果失败: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"获取结果失败: {str(e)}")
 
 @app.get("/api/results/latest")
 async def get_latest_result():
     """获取最新的分析结果"""
-    web_logger.info("收到获取最新结果请求")
+    web_logger.debug("收到获取最新结果请求")
     try:
-        results = load_results()
-        if results:
-            web_logger.info(f"返回最新结果，ID: {results[-1].get('id', 'unknown')}")
-            return JSONResponse(content={"result": results[-1]})
+        with _results_lock:
+            latest = next(reversed(_results.values()), None)
+        if latest is not None:
+            web_logger.debug("返回最新结果，ID: %s", latest.get('id', 'unknown'))
+            return ORJSONResponse(content={"result": latest})
         else:
-            web_logger.info("没有找到任何结果")
-            return JSONResponse(content={"result": None})
+            web_logger.debug("没有找到任何结果")
+            return ORJSONResponse(content={"result": None})
     except Exception as e:
-        web_logger.error(f"获取最新结果失败: {str(e)}", exc_info=True)
+        web_logger.error("获取最新结果失败: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"获取最新结果失败: {str(e)}")
 
-@app.post("/api/screenshot")
-async def receive_screenshot(data: ScreenshotData):
-    """接收截图数据和分析结果"""
-    web_logger.info("收到截图数据请求")
+# 请求体按Content-Type分别解析，JSON格式的结构在OpenAPI文档中单独声明
+@app.post("/api/screenshot", openapi_extra={
+    "requestBody": {"content": {"application/json": {"schema": ScreenshotData.model_json_schema()}}}
+})
+async def receive_screenshot(request: Request):
+    """接收截图数据和分析结果
+    
+    支持两种请求格式：multipart/form-data（image或file文件 + analysis/timestamp字段，
+    本地推送使用，无需base64编码）和JSON（ScreenshotData，图片为base64）。
+    multipart请求也可以只提供source_path字段，由服务端将同机截图硬链接到图片目录。
+    """
+    web_logger.debug("收到截图数据请求")
+    content_type = request.headers.get('content-type', '')
+    upload = None
+    source_path = None
+    if content_type.startswith('multipart/form-data'):
+        form = await request.form()
+        upload = form.get('image') or form.get('file')
+        source_path = form.get('source_path') or None
+        if (upload is None or not hasattr(upload, 'file')) and source_path is None:
+            raise HTTPException(status_code=422, detail="缺少image文件字段")
+        analysis = form.get('analysis') or None
+        timestamp = form.get('timestamp') or None
+    else:
+        data = await _parse_body(request, ScreenshotData)
+        analysis = data.analysis
+        timestamp = data.timestamp
+    
     try:
         # 生成文件名和ID
         result_id = generate_id()
-        web_logger.info(f"生成结果ID: {result_id}")
-        timestamp = data.timestamp or datetime.now().isoformat()
+        web_logger.debug("生成结果ID: %s", result_id)
         image_filename = f"screenshot_{result_id}.png"
         image_path = IMAGES_DIR / image_filename
         
-        # 保存图片
-        web_logger.info("开始保存图片")
-        image_data = base64.b64decode(data.image_base64)
-        with open(image_path, 'wb') as f:
-            f.write(image_data)
-        web_logger.info(f"图片保存成功: {image_path}")
+        # 保存图片（文件操作在线程池中执行，大图写入时不阻塞事件循环）
+        web_logger.debug("开始保存图片")
+        if source_path is not None and await run_in_threadpool(_link_source_image, source_path, image_path):
+            web_logger.debug("已硬链接本地截图，无需复制")
+        elif source_path is not None and (upload is None or not hasattr(upload, 'file')):
+            raise HTTPException(status_code=422, detail="无法导入source_path指定的截图，请上传image文件")
+        elif upload is not None:
+            # 上传文件已由multipart解析器缓存在临时文件中，分块复制到目标文件，
+            # 不再整体读入内存
+            await run_in_threadpool(_write_image, image_path, upload.file)
+        else:
+            # binascii.a2b_base64是b64decode底层的C实现，省去参数检查包装
+            await run_in_threadpool(_write_image, image_path, binascii.a2b_base64(data.image_base64))
+        web_logger.debug("图片保存成功: %s", image_path)
         
         # 创建结果记录
-        web_logger.info("创建分析结果对象")
-        result = {
-            "id": result_id,
-            "type": "screenshot",
-            "content": None,
-            "image_path": f"images/{image_filename}",
-            "analysis": data.analysis,
-            "timestamp": timestamp
-        }
+        web_logger.debug("创建分析结果对象")
+        result = _screenshot_record(result_id, image_filename, analysis, timestamp)
         
         # 保存到结果文件
-        web_logger.info("保存分析结果")
-        results = load_results()
-        results.append(result)
-        save_results(results)
-        web_logger.info(f"截图数据处理完成，ID: {result_id}")
+        web_logger.debug("保存分析结果")
+        await run_in_threadpool(add_result, result)
+        web_logger.debug("截图数据处理完成，ID: %s", result_id)
         
-        return JSONResponse(content={"status": "success", "id": result_id})
+        return ORJSONResponse(content={"status": "success", "id": result_id})
     
+    except HTTPException:
+        raise
     except Exception as e:
-        web_logger.error(f"处理截图数据失败: {str(e)}", exc_info=True)
+        web_logger.error("处理截图数据失败: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"处理截图数据失败: {str(e)}")
+
+_B64_WHITESPACE = b' \t\r\n'
+
+async def _stream_body_to_file(request: Request, image_path: Path, base64_encoded: bool) -> int:
+    """将请求体分块写入文件（base64_encoded时逐块解码），内存占用与块大小相关而不是整个请求体，
+    返回写入的字节数"""
+    f = await run_in_threadpool(open, image_path, 'wb')
+    written = 0
+    pending = b''
+    padded = False
+    try:
+        async for chunk in request.stream():
+            if base64_encoded:
+                # 只解码长度为4的倍数的部分，余下字符与下一块拼接；
+                # 严格模式下非法字符或块内提前出现的填充会抛出binascii.Error
+                pending += chunk.translate(None, _B64_WHITESPACE)
+                if padded and pending:
+                    raise binascii.Error("base64填充之后仍有数据")
+                cut = len(pending) - len(pending) % 4
+                aligned, pending = pending[:cut], pending[cut:]
+                chunk = binascii.a2b_base64(aligned, strict_mode=True)
+                padded = padded or aligned.endswith(b'=')
+            if chunk:
+                await run_in_threadpool(f.write, chunk)
+                written += len(chunk)
+        if pending:
+            raise binascii.Error("base64数据长度不正确")
+    finally:
+        await run_in_threadpool(f.close)
+    return written
+
+@app.post("/api/screenshot/raw")
+async def receive_screenshot_raw(request: Request, analysis: Optional[str] = None,
+                                 timestamp: Optional[str] = None, encoding: Optional[str] = None):
+    """接收原始图片字节作为请求体（如application/octet-stream），analysis/timestamp通过查询参数传递
+    
+    无需multipart解析，请求体分块写入文件；encoding=base64时请求体为base64文本，边接收边解码。
+    """
+    web_logger.debug("收到原始截图数据请求")
+    result_id = generate_id()
+    image_filename = f"screenshot_{result_id}.png"
+    image_path = IMAGES_DIR / image_filename
+    
+    try:
+        written = await _stream_body_to_file(request, image_path, encoding == "base64")
+    except (binascii.Error, ValueError) as e:
+        image_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=422, detail=f"图片数据解码失败: {str(e)}")
+    except Exception as e:
+        image_path.unlink(missing_ok=True)
+        web_logger.error("接收原始截图数据失败: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"处理截图数据失败: {str(e)}")
+    if not written:
+        image_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=422, detail="请求体为空，缺少图片数据")
+    
+    try:
+        await run_in_threadpool(add_result, _screenshot_record(result_id, image_filename, analysis or None, timestamp))
+        web_logger.debug("原始截图数据处理完成，ID: %s", result_id)
+        return ORJSONResponse(content={"status": "success", "id": result_id})
+    except Exception as e:
+        web_logger.error("处理原始截图数据失败: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"处理截图数据失败: {str(e)}")
 
 @app.post("/api/clipboard")
 async def receive_clipboard(data: ClipboardData):
     """接收剪贴板数据和分析结果"""
-    web_logger.info("收到剪贴板数据请求")
+    web_logger.debug("收到剪贴板数据请求")
     try:
         # 生成文件名和ID
         result_id = generate_id()
-        web_logger.info(f"生成结果ID: {result_id}")
-        timestamp = data.timestamp or datetime.now().isoformat()
-        web_logger.info(f"剪贴板文本长度: {len(data.text) if data.text else 0}")
+        web_logger.debug("生成结果ID: %s", result_id)
+        web_logger.debug("剪贴板文本长度: %s", len(data.text) if data.text else 0)
         
         # 创建结果记录
-        web_logger.info("创建剪贴板分析结果对象")
-        result = {
-            "id": result_id,
-            "timestamp": timestamp,
-            "type": "clipboard",
-            "content": data.text,
-            "analysis": data.analysis,
-            "image_path": None
-        }
+        web_logger.debug("创建剪贴板分析结果对象")
+        result = _clipboard_record(result_id, data.text, data.analysis, data.timestamp)
         
         # 保存到结果文件
-        web_logger.info("保存剪贴板分析结果")
-        results = load_results()
-        results.append(result)
-        save_results(results)
-        web_logger.info(f"剪贴板数据处理完成，ID: {result_id}")
+        web_logger.debug("保存剪贴板分析结果")
+        # 写文件在线程池中执行，不阻塞事件循环
+        await run_in_threadpool(add_result, result)
+        web_logger.debug("剪贴板数据处理完成，ID: %s", result_id)
         
-        return JSONResponse(content={"status": "success", "id": result_id})
+        return ORJSONResponse(content={"status": "success", "id": result_id})
     
     except Exception as e:
-        web_logger.error(f"处理剪贴板数据失败: {str(e)}", exc_info=True)
+        web_logger.error("处理剪贴板数据失败: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"处理剪贴板数据失败: {str(e)}")
 
-@app.delete("/api/results/{result_id}")
-async def delete_result(result_id: str):
-    """删除指定的分析结果"""
-    web_logger.info(f"收到删除结果请求，ID: {result_id}")
+@app.patch("/api/results/{result_id}")
+async def update_result_analysis(result_id: str, data: AnalysisUpdate):
+    """更新指定结果的分析内容"""
+    web_logger.debug("收到更新分析结果请求，ID: %s", result_id)
     try:
-        results = load_results()
-        original_count = len(results)
-        web_logger.info(f"当前共有 {original_count} 条结果")
+        if await run_in_threadpool(update_analysis, result_id, data.analysis):
+            web_logger.debug("成功更新结果 %s 的分析内容", result_id)
+            return ORJSONResponse(content={"status": "success", "id": result_id})
         
-        # 找到并删除结果
-        results = [r for r in results if r["id"] != result_id]
+        web_logger.warning("未找到要更新的结果 ID: %s", result_id)
+        raise HTTPException(status_code=404, detail="未找到指定的结果")
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        web_logger.error("更新分析结果失败: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"更新分析结果失败: {str(e)}")
+
+@app.delete("/api/results/{result_id}")
+def delete_result(result_id: str):
+    """删除指定的分析结果（同步接口，在线程池中执行）"""
+    web_logger.debug("收到删除结果请求，ID: %s", result_id)
+    try:
+        with _results_lock:
+            web_logger.debug("当前共有 %s 条结果", len(_results))
+            
+            # 找到并删除结果
+            found = result_id in _results
+            if found:
+                append_tombstone(result_id)
+                del _results[result_id]
+                # 墓碑行和被删除的记录行都是过期行
+                _mark_stale(2)
+            remaining = len(_results)
         
-        if len(results) < original_count:
-            save_results(results)
-            web_logger.info(f"成功删除结果 {result_id}，剩余 {len(results)} 条结果")
-            return JSONResponse(content={"status": "success", "message": "结果已删除"})
+        if found:
+            web_logger.debug("成功删除结果 %s，剩余 %s 条结果", result_id, remaining)
+            return ORJSONResponse(content={"status": "success", "message": "结果已删除"})
         else:
-            web_logger.warning(f"未找到要删除的结果 ID: {result_id}")
+            web_logger.warning("未找到要删除的结果 ID: %s", result_id)
             raise HTTPException(status_code=404, detail="未找到指定的结果")
     
     except HTTPException:
         raise
     except Exception as e:
-        web_logger.error(f"删除结果失败: {str(e)}", exc_info=True)
+        web_logger.error("删除结果失败: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"删除结果失败: {str(e)}")
 
 @app.get("/api/health")
 async def health_check():
     """健康检查接口"""
-    return JSONResponse(content={"status": "healthy", "service": "ExamAssistant Web Display"})
+    return ORJSONResponse(content={"status": "healthy", "service": "ExamAssistant Web Display"})
 
-def start_server(host: str = "127.0.0.1", port: int = 8000):
+def start_server(host: str = "127.0.0.1", port: int = 8000, max_results: int = DEFAULT_MAX_RESULTS):
     """启动Web服务器"""
-    web_logger.debug(f"准备启动Web服务器 - 主机: {host}, 端口: {port}")
+    global _max_results
+    web_logger.debug(f"准备启动Web服务器 - 主机: {host}, 端口: {port}, 最多保留 {max_results} 条结果")
+    _max_results = max(1, max_results)
     
     try:
-        # 检查端口是否可用
-        import socket
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(1)
-        result = sock.connect_ex((host if host != '0.0.0.0' else 'localhost', port))
-        sock.close()
-        
-        if result == 0:
-            web_logger.warning(f"端口 {port} 已被占用")
-        else:
-            web_logger.debug(f"端口 {port} 可用")
-        
+        # 不再预先探测端口，绑定失败时由uvicorn自身报错
         web_logger.info(f"🌐 Web服务器启动中... http://{host}:{port}")
         # 禁用uvicorn默认日志配置以避免PyInstaller打包环境下sys.stdout为None的问题
         uvicorn.run(
             app, 
             host=host, 
             port=port, 
+            loop="auto",      # 安装了uvloop时自动使用（Windows下无uvloop，回退到asyncio）
+            http="auto",      # 安装了httptools时自动使用
             log_config=None,  # 禁用默认日志配置
             access_log=False  # 禁用访问日志以避免stdout问题
         )